@@ -7,4 +7,33 @@ try:
 except Exception:
     pass
 
-cur.execute("CREATE TABLE chatids(id type unique, hour, min)")
\ No newline at end of file
+for table in (
+    "plans",
+    "notify",
+    "deliveries",
+    "plan_versions",
+    "filters",
+    "alerts_sent",
+    "workers",
+    "leader",
+    "daily_sent",
+    "refresh_requests",
+    "versions",
+):
+    try:
+        cur.execute(f"drop table {table}")
+    except Exception:
+        pass
+
+cur.execute("CREATE TABLE chatids(id type unique, hour, min)")
+cur.execute("CREATE TABLE plans(location, date, fetched, hash, data, unique(location, date))")
+cur.execute("CREATE TABLE notify(id unique)")
+cur.execute("CREATE TABLE deliveries(id, location, date, hash, unique(id, location, date))")
+cur.execute("CREATE TABLE plan_versions(hash unique, location, date, data)")
+cur.execute("CREATE TABLE filters(id, kind, value, unique(id, kind, value))")
+cur.execute("CREATE TABLE alerts_sent(id, date, keyword, unique(id, date, keyword))")
+cur.execute("CREATE TABLE workers(id unique, seen)")
+cur.execute("CREATE TABLE leader(id unique, worker, expires)")
+cur.execute("CREATE TABLE daily_sent(id, date, worker, done, unique(id, date))")
+cur.execute("CREATE TABLE refresh_requests(location, date, unique(location, date))")
+cur.execute("CREATE TABLE versions(name unique, version)")
@@ -7,29 +7,65 @@ The daily meal can be scheduled to be sent every day at a specific time, per use
 The exam scores being sent is only meant for private use. it can only be called from (and sent to)
 a single, hardcoded chat id, as the credentials are currently stored in clear text.
 """
+import argparse
+import asyncio
+import json
 import logging
+import logging.handlers
+import os
 import re
+import signal
 import sqlite3
 import sys
+from collections import Counter, deque
 from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
 from warnings import filterwarnings
 
-import scrapy
 from pid import PidFile
 from pid.base import PidFileAlreadyLockedError
-from playwright._impl._api_types import Error as PlaywrightError
-from playwright.async_api import async_playwright
-from scrapyscript import Job, Processor
-from telegram import Update
+from telegram import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+    Update,
+)
 from telegram.constants import ParseMode
-from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
+from telegram.error import BadRequest, TelegramError
+from telegram.ext import (
+    ApplicationBuilder,
+    CallbackQueryHandler,
+    CommandHandler,
+    ContextTypes,
+    InlineQueryHandler,
+)
 from telegram.warnings import PTBUserWarning
 
+from mensa_fetch import MenuFetcher, create_fetcher
+from mensa_plan import TAG_RULES, WORD_PATTERN, Plan, PlanDiff
+from mensa_ring import HashRing
+from mensa_stats import percentile
 
-def main():
-    """sets up the bot (using token), defines bot command handlers, configures logging and warnings,
-    and ensures only one instance is ever running.
-    Finally, starts application event polling loop."""
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """command line: optional config file and worker name (cluster mode)"""
+
+    parser = argparse.ArgumentParser(description="Mensa Telegram bot")
+    parser.add_argument("--config", default="config.txt", help="config file (key = value)")
+    parser.add_argument(
+        "--worker",
+        help=(
+            "run as one of several workers sharing jobs.db. "
+            "subscribers are split between the running workers"
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def main(args: argparse.Namespace):
+    """sets up the bot (using token), defines bot command handlers, configures logging and warnings.
+    Finally, starts application event polling loop (or, as a worker, joins the cluster)."""
 
     # silence warning that is already accounted for
     filterwarnings(
@@ -57,9 +93,153 @@ def main():
         )
         sys.exit()
 
+    CONFIG.update(load_config(args.config))
+
+    if args.worker:
+        Cluster().join(args.worker)
+
+    setup_event_log()
+
+    # fails early on an unknown fetch_backend
+    try:
+        get_fetcher()
+    except ValueError as exc:
+        logging.critical(str(exc))
+        sys.exit()
+
+    application = build_application(token)
+
+    # restoring all daily auto messages using chatids and times saved to jobs.db
+    JobManager(application).load_jobs()
+
+    if args.worker:
+        run_worker(application)
+    else:
+        application.run_polling()
+
+
+# defaults for every setting that can be overridden in config.txt
+CONFIG_DEFAULTS = {
+    "api_base_url": "https://api.telegram.org/bot",
+    "speiseplan_url": "https://www.studentenwerk-leipzig.de/mensen-cafeterien/speiseplan",
+    "grades_poller": "on",
+    # scrapy | http | fixture, see mensa_fetch.py
+    "fetch_backend": "http",
+    "fixture_dir": "fixtures",
+    # seconds a cached plan is used before it is fetched again
+    "plan_max_age": "3600",
+    # seconds between checks of today's plan for changes after delivery (/aenderungen)
+    "refresh_interval": "1800",
+    # comma separated chat ids that may use /stats
+    "admin_chat_ids": "578278860",
+    # structured event log (JSON lines), rotated at event_log_max_bytes
+    "event_log": "events.jsonl",
+    "event_log_max_bytes": "5000000",
+    "event_log_backups": "3",
+    # cluster mode (--worker): seconds between heartbeats, and without one until a worker
+    # is considered dead
+    "heartbeat_interval": "10",
+    "worker_timeout": "30",
+    # seconds a worker waits for the leader to cache a plan before crawling it itself
+    "plan_wait": "60",
+}
+CONFIG = dict(CONFIG_DEFAULTS)
+
+
+def load_config(path: str = "config.txt") -> dict:
+    """reads optional 'key = value' lines from the config file. missing file → defaults.
+    lines starting with '#' are ignored"""
+
+    config = dict(CONFIG_DEFAULTS)
+
+    try:
+        with open(path, "r", encoding="utf8") as fobj:
+            for line in fobj:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+
+                key, _, value = line.partition("=")
+                if key.strip() not in CONFIG_DEFAULTS:
+                    logging.warning("unknown config key '%s' in '%s'", key.strip(), path)
+                    continue
+                config[key.strip()] = value.strip()
+    except FileNotFoundError:
+        pass
+
+    return config
+
+
+def setup_event_log() -> None:
+    """writes the events recorded by Stats to CONFIG['event_log'] (one JSON object per line),
+    rotating the file when it reaches CONFIG['event_log_max_bytes']"""
+
+    path = CONFIG["event_log"]
+    if Cluster.worker_id is not None:
+        # one file per worker, rotation of a shared file isn't process safe
+        root, ext = os.path.splitext(path)
+        path = f"{root}-{Cluster.worker_id}{ext}"
+
+    handler = logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=int(CONFIG["event_log_max_bytes"]),
+        backupCount=int(CONFIG["event_log_backups"]),
+        encoding="utf8",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    event_logger = logging.getLogger("mensabot.events")
+    event_logger.setLevel(logging.INFO)
+    event_logger.propagate = False
+    event_logger.addHandler(handler)
+
+
+def is_admin(chat_id: int) -> bool:
+    """whether chat_id is listed in CONFIG['admin_chat_ids']"""
+
+    return str(chat_id) in (admin.strip() for admin in CONFIG["admin_chat_ids"].split(","))
+
+
+# the Mensa IDs that can be crawled
+MENSEN_IDS = {
+    # "Alle Mensen": "all", ### currently unsupported
+    "Dittrichring": 153,
+    "Botanischen Garten": 127,
+    "Academica": 118,
+    "am Park": 106,
+    "Elsterbecken": 115,
+    "Medizincampus": 162,
+    "Peterssteinweg": 111,
+    "Schoenauer Str": 140,
+    "Tierklinik": 170,
+}
+DEFAULT_LOCATION = MENSEN_IDS["am Park"]
+LOCATION_NAMES = {location: name for name, location in MENSEN_IDS.items()}
+# day words understood in inline mode → days from today
+INLINE_DAYS = {"heute": 0, "morgen": 1, "uebermorgen": 2, "übermorgen": 2}
+
+# fetch backend instances, created on first use
+FETCHERS = {}
+
+
+def get_fetcher() -> MenuFetcher:
+    """returns the fetch backend selected by CONFIG['fetch_backend']"""
+
+    backend = CONFIG["fetch_backend"]
+    if backend not in FETCHERS:
+        FETCHERS[backend] = create_fetcher(CONFIG)
+
+    return FETCHERS[backend]
+
+
+def build_application(token: str):
+    """creates the PTB application (using CONFIG for the API endpoint) and registers
+    all command handlers and repeating jobs. Does not load the daily jobs."""
+
     application = (
         ApplicationBuilder()
         .token(token)
+        .base_url(CONFIG["api_base_url"])
         .read_timeout(30)
         .write_timeout(30)
         .connect_timeout(30)
@@ -67,9 +247,6 @@ def main():
         .build()
     )
 
-    # restoring all daily auto messages using chatids and times saved to jobs.db
-    JobManager(application).load_jobs()
-
     start_handler = CommandHandler("start", start)
     application.add_handler(start_handler)
 
@@ -96,28 +273,308 @@ def main():
     send_mealjob_time_handler = CommandHandler("when", send_mealjob_time)
     application.add_handler(send_mealjob_time_handler)
 
+    stats_handler = CommandHandler("stats", stats)
+    application.add_handler(stats_handler)
+
     force_get_new_grades_handler = CommandHandler("cd", force_get_new_grades)
     application.add_handler(force_get_new_grades_handler)
 
     ack_handler = CommandHandler("ack", acknowledge)
     application.add_handler(ack_handler)
 
+    aenderungen_handler = CommandHandler("aenderungen", aenderungen)
+    application.add_handler(aenderungen_handler)
+
+    filter_handler = CommandHandler("filter", filter_meals)
+    application.add_handler(filter_handler)
+
+    alarm_handler = CommandHandler("alarm", alarm)
+    application.add_handler(alarm_handler)
+
+    navigate_handler = CallbackQueryHandler(navigate, pattern="^(plan|mensen):")
+    application.add_handler(navigate_handler)
+
+    inline_plan_handler = InlineQueryHandler(inline_plan)
+    application.add_handler(inline_plan_handler)
+
     application.job_queue.run_repeating(
-        callback=job_send_new_grades, interval=300, chat_id=578278860
+        callback=job_refresh_plans, interval=int(CONFIG["refresh_interval"]), first=10
     )
 
-    application.run_polling()
+    if CONFIG["grades_poller"] == "on":
+        application.job_queue.run_repeating(
+            callback=job_send_new_grades, interval=300, chat_id=578278860
+        )
+
+    if Cluster.worker_id is not None:
+        application.job_queue.run_repeating(
+            callback=job_heartbeat,
+            interval=int(CONFIG["heartbeat_interval"]),
+            first=int(CONFIG["heartbeat_interval"]),
+        )
+
+    return application
+
+
+def run_worker(application) -> None:
+    """cluster mode counterpart of application.run_polling(): runs jobs and handlers,
+    but only polls Telegram for updates while this worker is the leader
+    (a bot token can only be polled by one process)"""
+
+    loop = asyncio.get_event_loop()
+    for stop_signal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(stop_signal, loop.stop)
+
+    try:
+        loop.run_until_complete(application.initialize())
+        loop.run_until_complete(application.start())
+        loop.run_until_complete(follow_leadership(application))
+        loop.run_forever()
+    finally:
+        if application.updater.running:
+            loop.run_until_complete(application.updater.stop())
+        if application.running:
+            loop.run_until_complete(application.stop())
+        loop.run_until_complete(application.shutdown())
+        loop.close()
+
+        # lets the others take over right away instead of after worker_timeout
+        Cluster().leave()
+
+
+async def follow_leadership(application) -> None:
+    """starts/stops polling for updates when this worker became/stopped being the leader"""
+
+    updater = application.updater
+    if Cluster().is_leader() and not updater.running:
+        await updater.start_polling()
+    elif not Cluster().is_leader() and updater.running:
+        await updater.stop()
+
+
+class Cluster:
+    """membership of this worker in a cluster of bot processes sharing jobs.db.
+    workers announce themselves with heartbeats, subscribers are split between the live
+    workers by consistent hashing (see mensa_ring.py), and a lease elects exactly one leader
+    that crawls, polls grades and receives updates. Without join (no --worker),
+    this process is the only worker: it owns every chat and is the leader"""
+
+    con = sqlite3.connect("jobs.db")
+    cur = con.cursor()
+    # this worker's name, None if not running as a worker
+    worker_id = None
+    # live workers (including this one) → time of their last heartbeat
+    workers = {}
+    ring = None
+    leader = False
+    # name of shared state → last seen version (see bump)
+    seen_versions = {}
+
+    def join(self, worker_id: str) -> None:
+        """creates the cluster tables if necessary and sends the first heartbeat"""
+
+        Cluster.worker_id = worker_id
+
+        # readers don't block the writer (and vice versa) of other processes
+        Cluster.cur.execute("pragma journal_mode=wal")
+        Cluster.cur.execute("create table if not exists workers(id unique, seen)")
+        Cluster.cur.execute("create table if not exists leader(id unique, worker, expires)")
+        Cluster.cur.execute(
+            "create table if not exists daily_sent(id, date, worker, done, unique(id, date))"
+        )
+        Cluster.cur.execute(
+            "create table if not exists refresh_requests(location, date, unique(location, date))"
+        )
+        Cluster.cur.execute("create table if not exists versions(name unique, version)")
+        Cluster.con.commit()
+
+        # the state loaded at startup is current
+        Cluster.seen_versions = dict(Cluster.cur.execute("select name, version from versions"))
+
+        self.heartbeat()
+
+    def leave(self) -> None:
+        """removes this worker and gives up the lease (on a clean shutdown)"""
+
+        if Cluster.worker_id is None:
+            return
+
+        Cluster.cur.execute("delete from workers where id = ?", [Cluster.worker_id])
+        Cluster.cur.execute("delete from leader where worker = ?", [Cluster.worker_id])
+        Cluster.con.commit()
+
+    def heartbeat(self) -> tuple[bool, list]:
+        """announces this worker, updates the set of live workers and renews/acquires the
+        leader lease. returns whether the set of live workers changed, and the names of the
+        workers that left since the previous call (their deliveries might be missing)"""
+
+        now = datetime.now().timestamp()
+        timeout = int(CONFIG["worker_timeout"])
+
+        Cluster.cur.execute(
+            "insert or replace into workers values(?,?)", [Cluster.worker_id, now]
+        )
+        # the lease goes to whoever asks first once it expired
+        Cluster.cur.execute(
+            "insert into leader values(0,?,?) on conflict(id) do update "
+            "set worker = excluded.worker, expires = excluded.expires "
+            "where leader.worker = excluded.worker or leader.expires < ?",
+            [Cluster.worker_id, now + timeout, now],
+        )
+        Cluster.con.commit()
+
+        workers = dict(
+            Cluster.cur.execute(
+                "select id, seen from workers where seen > ?", [now - timeout]
+            ).fetchall()
+        )
+        Cluster.leader = Cluster.cur.execute(
+            "select worker from leader where id = 0"
+        ).fetchone() == (Cluster.worker_id,)
+
+        departed = [worker for worker in Cluster.workers if worker not in workers]
+        changed = Cluster.ring is None or set(workers) != set(Cluster.workers)
+        if changed:
+            Cluster.ring = HashRing(workers)
+            logging.warning(
+                "worker %s: live workers %s, leader: %s",
+                Cluster.worker_id,
+                ", ".join(sorted(workers)),
+                Cluster.leader,
+            )
+        Cluster.workers = workers
+
+        if Cluster.leader:
+            Cluster.cur.execute("delete from daily_sent where date < ?", [str(date.today())])
+            Cluster.con.commit()
+
+        return changed, departed
+
+    def is_leader(self) -> bool:
+        """whether this worker crawls, polls grades and handles updates"""
+
+        return Cluster.worker_id is None or Cluster.leader
+
+    def owns(self, chat_id: int) -> bool:
+        """whether this worker delivers the daily plan to chat_id"""
+
+        return Cluster.worker_id is None or Cluster.ring.worker_for(chat_id) == Cluster.worker_id
+
+    def claim_delivery(self, chat_id: int, using_date: date) -> bool:
+        """reserves today's delivery to chat_id for this worker. False if another worker
+        already delivered it, or is still alive and delivering it right now"""
+
+        if Cluster.worker_id is None:
+            return True
+
+        Cluster.cur.execute(
+            "insert or ignore into daily_sent values(?,?,?,0)",
+            [chat_id, str(using_date), Cluster.worker_id],
+        )
+        if Cluster.cur.rowcount == 0:
+            # taking over a claim of a worker that died before confirming it
+            Cluster.cur.execute(
+                "update daily_sent set worker = ? where id = ? and date = ? and done = 0 "
+                "and worker not in (select id from workers where seen > ?)",
+                [
+                    Cluster.worker_id,
+                    chat_id,
+                    str(using_date),
+                    datetime.now().timestamp() - int(CONFIG["worker_timeout"]),
+                ],
+            )
+        claimed = Cluster.cur.rowcount == 1
+        Cluster.con.commit()
+
+        return claimed
+
+    def undelivered(self, chat_ids, departed: list, using_date: date) -> list:
+        """those of chat_ids that nobody delivered to on using_date: never claimed, or claimed
+        by one of the departed workers, which died before confirming the delivery"""
+
+        claims = {
+            chat_id: (worker, done)
+            for chat_id, worker, done in Cluster.cur.execute(
+                "select id, worker, done from daily_sent where date = ?", [str(using_date)]
+            )
+        }
+
+        return [
+            chat_id
+            for chat_id in chat_ids
+            if chat_id not in claims
+            or (claims[chat_id][1] == 0 and claims[chat_id][0] in departed)
+        ]
+
+    def request_refresh(self, location: int, using_date: date) -> None:
+        """asks the leader to fetch a plan (see take_refresh_requests)"""
+
+        Cluster.cur.execute(
+            "insert or ignore into refresh_requests values(?,?)", [location, str(using_date)]
+        )
+        Cluster.con.commit()
+
+    def take_refresh_requests(self) -> list:
+        """(location, date) of all plans other workers asked for, removing the requests"""
+
+        requests = Cluster.cur.execute("select location, date from refresh_requests").fetchall()
+        if requests:
+            Cluster.cur.execute("delete from refresh_requests")
+            Cluster.con.commit()
+
+        return [(location, date.fromisoformat(plan_date)) for location, plan_date in requests]
+
+    def bump(self, name: str) -> None:
+        """tells the other workers that the shared state 'name' (a table in jobs.db) changed"""
+
+        if Cluster.worker_id is None:
+            return
+
+        Cluster.cur.execute(
+            "insert into versions values(?,1) on conflict(name) do update "
+            "set version = version + 1",
+            [name],
+        )
+        Cluster.con.commit()
+
+    def changed(self, name: str) -> bool:
+        """whether 'name' was bumped since the last call (also by this worker)"""
+
+        row = Cluster.cur.execute("select version from versions where name = ?", [name]).fetchone()
+        version = None if row is None else row[0]
+        if version == Cluster.seen_versions.get(name):
+            return False
+
+        Cluster.seen_versions[name] = version
+        return True
+
+    def confirm_delivery(self, chat_id: int, using_date: date) -> None:
+        """marks a claimed delivery as done"""
+
+        if Cluster.worker_id is None:
+            return
+
+        Cluster.cur.execute(
+            "update daily_sent set done = 1 where id = ? and date = ?",
+            [chat_id, str(using_date)],
+        )
+        Cluster.con.commit()
 
 
 class JobManager:
     """manages restoring jobs at startup, creating new jobs and unloading jobs.
     these jobs refer to automatically sending today's meal to a subscribed chat id,
-    using a user-defined time of day"""
+    using a user-defined time of day.
+    in cluster mode, only the jobs of chats this worker owns are loaded"""
 
     con = sqlite3.connect("jobs.db")
     cur = con.cursor()
     loaded_jobs = {}
+    # chat id → (hour, minute) in local time, of every subscriber (not only loaded ones)
+    job_times = {}
     application = None
+    # cron weekday scheme (0 = sunday): mon-fri
+    days = (1, 2, 3, 4, 5)
 
     def __init__(self, application=None):
         """application ref is optional and is used to load/unload jobs
@@ -154,258 +611,872 @@ class JobManager:
             sys.exit()
 
         for line in data:
-            utc_time = self.conv_to_utc(hour=int(line[1]), minute=int(line[2]))
-
-            job_reference = JobManager.application.job_queue.run_daily(
-                callback=job_send_today_meals,
-                time=utc_time,
-                days=(1, 2, 3, 4, 5),
-                chat_id=int(line[0]),
-            )
-            JobManager.loaded_jobs[int(line[0])] = job_reference
-
-    def add_job(self, chat_id: int, hour: int, minute: int) -> None:
-        """adds a job to DB and then loads it"""
+            JobManager.job_times[int(line[0])] = (int(line[1]), int(line[2]))
+            if Cluster().owns(int(line[0])):
+                self.load_job(chat_id=int(line[0]), hour=int(line[1]), minute=int(line[2]))
 
-        JobManager.cur.execute(
-            "insert into chatids values(?,?,?)", [chat_id, hour, minute]
-        )
-        JobManager.con.commit()
+    def load_job(self, chat_id: int, hour: int, minute: int) -> None:
+        """starts the daily job of a chat"""
 
         utc_time = self.conv_to_utc(hour=hour, minute=minute)
 
-        # starting the job
         job_reference = JobManager.application.job_queue.run_daily(
             callback=job_send_today_meals,
             time=utc_time,
-            days=(1, 2, 3, 4, 5),
+            days=JobManager.days,
             chat_id=chat_id,
         )
 
         # saving the ref to loaded job (so that it can be unloaded)
         JobManager.loaded_jobs[chat_id] = job_reference
 
+    def add_job(self, chat_id: int, hour: int, minute: int) -> None:
+        """adds a job to DB and then loads it"""
+
+        JobManager.cur.execute(
+            "insert into chatids values(?,?,?)", [chat_id, hour, minute]
+        )
+        JobManager.con.commit()
+        Cluster().bump("chatids")
+
+        JobManager.job_times[chat_id] = (hour, minute)
+        if Cluster().owns(chat_id):
+            self.load_job(chat_id=chat_id, hour=hour, minute=minute)
+
     def remove_job(self, chat_id: int) -> None:
-        """removes a job from DB and then unloads it"""
+        """removes a job from DB and then unloads it. KeyError if there is none"""
 
         JobManager.cur.execute("delete from chatids where id = (?)", [chat_id])
         JobManager.con.commit()
+        Cluster().bump("chatids")
+
+        del JobManager.job_times[chat_id]
+        if chat_id in JobManager.loaded_jobs:
+            JobManager.loaded_jobs.pop(chat_id).schedule_removal()
+
+    def sync(self) -> None:
+        """cluster mode: picks up subscriptions changed by other workers (the leader handles
+        the commands) and (un)loads jobs, so that exactly the owned chats are loaded"""
+
+        job_times = {
+            int(chat_id): (int(hour), int(minute))
+            for chat_id, hour, minute in JobManager.cur.execute(
+                "select id, hour, min from chatids"
+            ).fetchall()
+        }
+
+        for chat_id in list(JobManager.loaded_jobs):
+            if job_times.get(chat_id) != JobManager.job_times.get(chat_id) or not Cluster().owns(
+                chat_id
+            ):
+                JobManager.loaded_jobs.pop(chat_id).schedule_removal()
+
+        JobManager.job_times = job_times
+        for chat_id, (hour, minute) in job_times.items():
+            if chat_id not in JobManager.loaded_jobs and Cluster().owns(chat_id):
+                self.load_job(chat_id=chat_id, hour=hour, minute=minute)
+
+    def due_today(self) -> list:
+        """chat ids whose delivery time today has passed"""
+
+        now = datetime.now()
+        # cron weekday scheme, like JobManager.days
+        if now.isoweekday() % 7 not in JobManager.days:
+            return []
+
+        return [
+            chat_id
+            for chat_id, (hour, minute) in JobManager.job_times.items()
+            if now.replace(hour=hour, minute=minute, second=0, microsecond=0) <= now
+        ]
+
+    def get_job_time(self, chat_id: int) -> Optional[str]:
+        """retrieves the time at which the job for a given chat id will be run.
+        None if there is none"""
+
+        if chat_id not in JobManager.job_times:
+            return None
+
+        hour, minute = JobManager.job_times[chat_id]
+        return f"{hour:02}:{minute:02} Uhr"
+
+    def get_time_slots(self) -> Counter:
+        """number of subscribers per time of day ('HH:MM')"""
+
+        return Counter(f"{hour:02}:{minute:02}" for hour, minute in JobManager.job_times.values())
+
+
+class Stats:
+    """aggregates operational events in memory (for /stats) and writes every event
+    as one JSON line to the event log (see setup_event_log), for offline analysis"""
+
+    started = datetime.now()
+    cache_hits = 0
+    cache_misses = 0
+    # latencies (ms) of the most recent crawls
+    crawl_latencies = deque(maxlen=1000)
+    crawl_failures = 0
+    sends = 0
+    # error type → count
+    send_failures = Counter()
+    grade_polls = 0
+    grade_poll_failures = 0
+    last_grade_poll = None
+    last_grade_poll_error = None
+
+    def record(self, event: str, **fields) -> None:
+        """counts the event and appends it to the event log"""
+
+        if event == "cache":
+            if fields["hit"]:
+                Stats.cache_hits += 1
+            else:
+                Stats.cache_misses += 1
+
+        elif event == "crawl":
+            if fields["ok"]:
+                Stats.crawl_latencies.append(fields["ms"])
+            else:
+                Stats.crawl_failures += 1
+
+        elif event == "send":
+            if fields["ok"]:
+                Stats.sends += 1
+            else:
+                Stats.send_failures[fields["error"]] += 1
+
+        elif event == "grade_poll":
+            Stats.grade_polls += 1
+            Stats.last_grade_poll = datetime.now()
+            if not fields["ok"]:
+                Stats.grade_poll_failures += 1
+                Stats.last_grade_poll_error = fields["error"]
+
+        if Cluster.worker_id is not None:
+            fields["worker"] = Cluster.worker_id
+
+        logging.getLogger("mensabot.events").info(
+            json.dumps(
+                {"ts": datetime.now().isoformat(timespec="milliseconds"), "event": event, **fields},
+                ensure_ascii=False,
+                default=str,
+            )
+        )
+
+    def summary(self) -> str:
+        """aggregated stats as message text (no per-user data)"""
+
+        slots = JobManager().get_time_slots()
+        lookups = Stats.cache_hits + Stats.cache_misses
+        latencies = sorted(Stats.crawl_latencies)
 
-        JobManager.loaded_jobs[chat_id].schedule_removal()
-        del JobManager.loaded_jobs[chat_id]
+        message = f"Seit {Stats.started:%d.%m.%Y %H:%M}\n\n"
+        if Cluster.worker_id is not None:
+            # everything but the subscribers only covers this worker (the leader)
+            message += (
+                f"Worker {Cluster.worker_id} (Leader: {'ja' if Cluster.leader else 'nein'}), "
+                f"aktiv: {', '.join(sorted(Cluster.workers))}\n\n"
+            )
+        message += f"Abonnenten: {sum(slots.values())}\n"
+        for slot, count in sorted(slots.most_common(10)):
+            message += f"  {slot}: {count}\n"
+        if len(slots) > 10:
+            message += f"  (+{len(slots) - 10} weitere Zeiten)\n"
+
+        if lookups:
+            message += f"\nCache: {Stats.cache_hits / lookups:.1%} Treffer ({lookups} Abfragen)\n"
+        else:
+            message += "\nCache: keine Abfragen\n"
+
+        message += f"Crawls: {len(latencies)} ok, {Stats.crawl_failures} fehlgeschlagen\n"
+        if latencies:
+            message += (
+                f"  Latenz p50 {percentile(latencies, 50):.0f} ms, "
+                f"p95 {percentile(latencies, 95):.0f} ms, "
+                f"p99 {percentile(latencies, 99):.0f} ms\n"
+            )
+
+        message += (
+            f"\nAutomatische Nachrichten: {Stats.sends} gesendet, "
+            f"{sum(Stats.send_failures.values())} fehlgeschlagen\n"
+        )
+        for error, count in Stats.send_failures.most_common():
+            message += f"  {error}: {count}\n"
+
+        if Stats.last_grade_poll is None:
+            message += "\nNoten-Abfrage: noch nicht gelaufen\n"
+        else:
+            message += (
+                f"\nNoten-Abfrage: {Stats.grade_polls}x, {Stats.grade_poll_failures} Fehler, "
+                f"zuletzt {Stats.last_grade_poll:%H:%M}\n"
+            )
+            if Stats.last_grade_poll_error:
+                message += f"  letzter Fehler: {Stats.last_grade_poll_error}\n"
+
+        return message
+
+
+async def send_tracked(bot, kind: str, chat_id: int, **kwargs) -> bool:
+    """sends a message and records the outcome as 'send' event.
+    returns False (instead of raising) if Telegram refused it,
+    e.g. because the user blocked the bot"""
+
+    try:
+        await bot.send_message(chat_id=chat_id, **kwargs)
+    except TelegramError as exc:
+        Stats().record("send", kind=kind, ok=False, error=type(exc).__name__, chat_id=chat_id)
+        logging.warning("couldn't send %s to %s: %s", kind, chat_id, exc)
+        return False
+
+    Stats().record("send", kind=kind, ok=True)
+    return True
+
+
+class PlanStore:
+    """caches plans per (location, date), in memory and in jobs.db, so that all subscribers
+    (and restarts) share one fetch. Concurrent requests for the same plan wait for the same fetch.
+    Plans of past days are dropped."""
+
+    con = sqlite3.connect("jobs.db")
+    cur = con.cursor()
+    table_ready = False
+    # (location, date) → (time of fetch, Plan)
+    plans = {}
+    # (location, date) → task of the fetch that is currently running
+    pending = {}
+
+    def setup_table(self) -> None:
+        """creates the cache table in jobs.db, if it doesn't exist yet"""
+
+        if not PlanStore.table_ready:
+            PlanStore.cur.execute(
+                "create table if not exists plans"
+                "(location, date, fetched, hash, data, unique(location, date))"
+            )
+            PlanStore.con.commit()
+            PlanStore.table_ready = True
+
+    async def get_plan(
+        self, location: int, using_date: date, max_age: Optional[int] = None
+    ) -> Plan:
+        """returns the cached plan if it is recent enough (max_age seconds, by default
+        CONFIG['plan_max_age']), fetches it otherwise.
+        in cluster mode, other workers than the leader return an outdated plan as well,
+        and ask the leader to refresh it"""
+
+        if max_age is None:
+            max_age = int(CONFIG["plan_max_age"])
+
+        entry = self._cached_entry(location=location, using_date=using_date, max_age=max_age)
+        if entry is not None and datetime.now().timestamp() - entry[0] < max_age:
+            Stats().record("cache", hit=True)
+            return entry[1]
+
+        if entry is not None and not Cluster().is_leader():
+            Stats().record("cache", hit=True, stale=True)
+            Cluster().request_refresh(location=location, using_date=using_date)
+            return entry[1]
+
+        Stats().record("cache", hit=False, location=location, date=using_date)
+        return await self.refresh(location=location, using_date=using_date)
+
+    def get_cached(self, location: int, using_date: date) -> Optional[Plan]:
+        """returns the cached plan regardless of its age, never fetches. None if not cached"""
+
+        entry = self._cached_entry(location=location, using_date=using_date)
+        Stats().record("cache", hit=entry is not None)
+        return None if entry is None else entry[1]
+
+    def _cached_entry(
+        self, location: int, using_date: date, max_age: Optional[int] = None
+    ) -> Optional[tuple[float, Plan]]:
+        key = (location, using_date)
+        entry = PlanStore.plans.get(key)
+
+        if entry is None or (
+            max_age is not None and datetime.now().timestamp() - entry[0] >= max_age
+        ):
+            # not in memory (e.g. after a restart), or outdated in memory
+            # (another worker might have stored a newer one): try the DB
+            self.setup_table()
+            row = PlanStore.cur.execute(
+                "select fetched, data from plans where location = ? and date = ?",
+                [location, str(using_date)],
+            ).fetchone()
+            if row is not None and (entry is None or row[0] > entry[0]):
+                entry = (row[0], Plan.from_json(row[1], location=location))
+                PlanStore.plans[key] = entry
+
+        return entry
+
+    async def refresh(self, location: int, using_date: date) -> Plan:
+        """fetches and stores the plan. Concurrent calls for the same plan share one fetch.
+        in cluster mode, only the leader fetches, the others wait for its result in jobs.db"""
+
+        key = (location, using_date)
+        if key not in PlanStore.pending:
+            if Cluster().is_leader():
+                fetch = self._fetch_and_put(location=location, using_date=using_date)
+            else:
+                fetch = self._wait_for_leader(location=location, using_date=using_date)
+            PlanStore.pending[key] = asyncio.ensure_future(fetch)
+
+        return await PlanStore.pending[key]
+
+    async def _wait_for_leader(self, location: int, using_date: date) -> Plan:
+        """asks the leader to fetch the plan and polls jobs.db until it is stored.
+        raises TimeoutError if that takes longer than CONFIG['plan_wait'],
+        like a failed fetch (never fetches itself: only the leader crawls)"""
+
+        Cluster().request_refresh(location=location, using_date=using_date)
+        deadline = datetime.now().timestamp() + int(CONFIG["plan_wait"])
+
+        try:
+            while datetime.now().timestamp() < deadline:
+                entry = self._cached_entry(location=location, using_date=using_date)
+                if entry is not None:
+                    return entry[1]
+
+                await asyncio.sleep(0.5)
+        finally:
+            del PlanStore.pending[(location, using_date)]
 
-    def get_job_times(self) -> tuple[str, str]:
-        """retrieves the time at which a job for a given chat id will be run"""
+        raise TimeoutError(f"leader didn't store the plan for {using_date} in time")
 
-        ##### retrieval from DB. This assumes that time is parsed && job is loaded correctly
-        # job_time = JobManager.cur.execute(
-        #     "select hour,minute from chatids where id=(?)", [chat_id]
-        # ).fetchone()
-        # formatted_string = str(hour) + ":" + str(minute) + " Uhr"
+    async def _fetch_and_put(self, location: int, using_date: date) -> Plan:
+        started = datetime.now()
+        try:
+            plan = await get_fetcher().fetch(location=location, using_date=using_date)
+        except Exception as exc:
+            Stats().record(
+                "crawl",
+                ok=False,
+                error=type(exc).__name__,
+                backend=CONFIG["fetch_backend"],
+                location=location,
+                date=using_date,
+            )
+            raise
+        finally:
+            del PlanStore.pending[(location, using_date)]
+
+        Stats().record(
+            "crawl",
+            ok=True,
+            ms=round((datetime.now() - started).total_seconds() * 1000, 1),
+            backend=CONFIG["fetch_backend"],
+            location=location,
+            date=using_date,
+            hash=plan.content_hash,
+        )
 
-        # ugly
-        formatted_string = f"count: {len(JobManager.loaded_jobs)}\n"
+        self.put(plan, using_date=using_date)
+        return plan
 
-        for job_item in JobManager.loaded_jobs.items():
-            formatted_string += str(job_item[1].job.trigger) + "\n"
+    def put(self, plan: Plan, using_date: date) -> None:
+        """stores a plan that was fetched for using_date"""
+
+        self.setup_table()
+        fetched = datetime.now().timestamp()
+        PlanStore.plans[(plan.location, using_date)] = (fetched, plan)
+
+        PlanStore.cur.execute(
+            "insert or replace into plans values(?,?,?,?,?)",
+            [plan.location, str(using_date), fetched, plan.content_hash, plan.to_json()],
+        )
+        PlanStore.cur.execute("delete from plans where date < ?", [str(date.today())])
+        PlanStore.con.commit()
 
-        return formatted_string
+        for key in [key for key in PlanStore.plans if key[1] < date.today()]:
+            del PlanStore.plans[key]
 
 
-###### crawler setup and stuff
-class MensaSpider(scrapy.Spider):
-    """scrapy Spider instance that scrapes data from Studentenwerk Leipzig.
-    Has to be instantiated using URL with date parameter"""
+class ChangeNotifier:
+    """opt-in notifications about changes to today's plan after it was delivered.
+    remembers which plan version (content hash) every opted-in chat received,
+    so a refresh can send a compact delta instead of the full plan.
+    Everything is kept in memory and mirrored to jobs.db, so restarts don't lose it."""
 
-    name = "mensaplan"
+    con = sqlite3.connect("jobs.db")
+    cur = con.cursor()
+    loaded = False
+    # chat ids that opted in
+    subscribers = set()
+    # (location, date) → {plan hash: chat ids that received that version}
+    delivered = {}
+    # plan hash → Plan, for every delivered version
+    versions = {}
+    # day of the last load/prune, deliveries of earlier days are dropped once it changes
+    day = None
+
+    def load(self) -> None:
+        """creates tables if necessary and restores opt-ins and today's deliveries"""
+
+        if ChangeNotifier.loaded:
+            if ChangeNotifier.day != date.today():
+                self.prune()
+            return
 
-    def parse(self, response, **kwargs):
+        ChangeNotifier.cur.execute("create table if not exists notify(id unique)")
+        ChangeNotifier.cur.execute(
+            "create table if not exists deliveries"
+            "(id, location, date, hash, unique(id, location, date))"
+        )
+        ChangeNotifier.cur.execute(
+            "create table if not exists plan_versions(hash unique, location, date, data)"
+        )
+        ChangeNotifier.cur.execute("delete from deliveries where date < ?", [str(date.today())])
+        ChangeNotifier.cur.execute("delete from plan_versions where date < ?", [str(date.today())])
+        ChangeNotifier.con.commit()
 
-        result = {
-            "date": "",
-            "meal_groups": []
+        ChangeNotifier.subscribers = {
+            row[0] for row in ChangeNotifier.cur.execute("select id from notify")
+        }
+        for (plan_hash,) in ChangeNotifier.cur.execute("select hash from plan_versions").fetchall():
+            # versions are immutable, only new ones have to be parsed (see reload)
+            if plan_hash not in ChangeNotifier.versions:
+                location, data = ChangeNotifier.cur.execute(
+                    "select location, data from plan_versions where hash = ?", [plan_hash]
+                ).fetchone()
+                ChangeNotifier.versions[plan_hash] = Plan.from_json(data, location=location)
+        for chat_id, location, plan_date, plan_hash in ChangeNotifier.cur.execute(
+            "select id, location, date, hash from deliveries"
+        ).fetchall():
+            key = (location, date.fromisoformat(plan_date))
+            ChangeNotifier.delivered.setdefault(key, {}).setdefault(plan_hash, set()).add(chat_id)
+
+        ChangeNotifier.day = date.today()
+        ChangeNotifier.loaded = True
+
+    def prune(self) -> None:
+        """drops deliveries (and plan versions no longer needed) of past days"""
+
+        ChangeNotifier.cur.execute("delete from deliveries where date < ?", [str(date.today())])
+        ChangeNotifier.cur.execute("delete from plan_versions where date < ?", [str(date.today())])
+        ChangeNotifier.con.commit()
+
+        for key in [key for key in ChangeNotifier.delivered if key[1] < date.today()]:
+            del ChangeNotifier.delivered[key]
+        still_delivered = {
+            plan_hash for by_hash in ChangeNotifier.delivered.values() for plan_hash in by_hash
         }
+        for plan_hash in [h for h in ChangeNotifier.versions if h not in still_delivered]:
+            del ChangeNotifier.versions[plan_hash]
 
-        # extracted date from website, to verify if it matches requested date
-        result["date"] = response.css(
-            'select#edit-date>option[selected="selected"]::text'
-        ).get()
-
-        for header in response.css("h3.title-prim"):
-            # can contain one or multiple individual meal items
-            meal_group = {
-                "type": "",
-                "sub_meals": []
-            }
-            # TYP
-            meal_group["type"] = header.xpath("text()").get()
-
-            # ALL following siblings
-            for subitem in header.xpath("following-sibling::*"):
-
-                if subitem.attrib == {"class": "title-prim"}: # or len(subitem.xpath("following-sibling::*")) == 0:
-                    break
-                # new sub meal was found
-
-                elif subitem.attrib == {"class": "accordion u-block"}:
-                    for subsubitem in subitem.xpath("child::section"):
-                        meal = {
-                            "name": subsubitem.xpath("header/div/div/h4/text()").get(),
-                            "additional_ingredients": subsubitem.xpath("details/ul/li/text()").getall(),
-                            "prices": subsubitem.xpath("header/div/div/p/text()[2]").get().strip()
-                        }
-                        
-                        # saving extracted data to individual meal data
-                        meal_group["sub_meals"].append(meal)
-
-            result["meal_groups"].append(meal_group)
-
-
-        yield result
-
-        # result = {
-        #     "date": "",
-        #     "all_meals": []
-        # }
-
-        # # extracted date from website, to verify if it matches requested date
-        # result["date"] = response.css(
-        #     'select#edit-date>option[selected="selected"]::text'
-        # ).get()
-
-        # for header in response.css("h3.title-prim"):
-        #     # contains all 'root-level' meal types
-        #     meal_group = {
-        #         "type": "",
-        #         "sub_meals": []
-        #     }
-
-        #     # gets appended to meal_group['sub_meal']
-        #     # a meal group can have 1 or more meals
-        #     meal = {
-        #         "name": "",
-        #         "additional_ingredients": [],
-        #         "prices": ""
-        #     }
-
-        #     # type of meal, like 'vegetarian'
-        #     # meal["type"] = header.xpath("text()").get()
-
-        #     for subitem in header.xpath("following-sibling::*"):
-        #         meal_group["type"] = header.xpath("text()").get()
-
-        #         # title-prim ≙ begin of next menu type/end of this menu → stop processing
-        #         if subitem.attrib == {"class": "title-prim"}:
-        #             #print("END OF", header.xpath("text()").get())
-        #             ######## end of block - write out meal type
-        #             # meal_group["type"] = header.xpath("text()").get()
-        #             #result['all_meals'].append(meal_group)
-        #             break
-
-        #         # accordion u-block: top-level item of a meal type
-        #         # (usually there just is 1 u-block but there can be multiple)
-        #         if subitem.attrib == {"class": "accordion u-block"}:
-        #             for subsubitem in subitem.xpath("child::section"):
-
-        #                 meal["name"] = subsubitem.xpath("header/div/div/h4/text()").get()
-        #                 meal["additional_ingredients"] = subsubitem.xpath(
-        #                     "details/ul/li/text()"
-        #                 ).getall()
-        #                 meal["prices"] = (
-        #                     subsubitem.xpath("header/div/div/p/text()[2]").get().strip()
-        #                 )
-        #                 # saving extracted data to individual meal data
-        #                 meal_group["sub_meals"].append(meal)
-                
-        #         print("AFTER BREAK???")
-        #         result['all_meals'].append(meal_group)
-                
-        # yield result
-
-
-def mensa_data_to_string(mensa_data, using_date) -> str:
-    """formats the raw data that is returned from MensaSpider.
+        ChangeNotifier.day = date.today()
+
+    def reload(self) -> None:
+        """discards opt-ins and deliveries and loads them again from jobs.db
+        (cluster mode: picks up changes of other workers). known plan versions are kept"""
+
+        ChangeNotifier.subscribers = set()
+        ChangeNotifier.delivered = {}
+        ChangeNotifier.loaded = False
+        self.load()
+
+    def set_enabled(self, chat_id: int, enabled: bool) -> None:
+        """opt in/out of change notifications"""
+
+        self.load()
+        if enabled:
+            ChangeNotifier.cur.execute("insert or ignore into notify values(?)", [chat_id])
+            ChangeNotifier.subscribers.add(chat_id)
+        else:
+            ChangeNotifier.cur.execute("delete from notify where id = (?)", [chat_id])
+            ChangeNotifier.subscribers.discard(chat_id)
+        ChangeNotifier.con.commit()
+        Cluster().bump("notify")
+
+    def is_enabled(self, chat_id: int) -> bool:
+        """whether the chat opted in"""
+
+        self.load()
+        return chat_id in ChangeNotifier.subscribers
+
+    def has_deliveries(self, location: int, using_date: date) -> bool:
+        """whether any opted-in chat received this plan (i.e. checking for changes makes sense)"""
+
+        self.load()
+        return bool(ChangeNotifier.delivered.get((location, using_date)))
+
+    def record_delivery(self, chat_id: int, plan: Plan, using_date: date) -> None:
+        """remembers that chat_id received this version of the plan (only if it opted in)"""
+
+        self.load()
+        if chat_id not in ChangeNotifier.subscribers or not plan.is_available_for(using_date):
+            return
+
+        if plan.content_hash not in ChangeNotifier.versions:
+            ChangeNotifier.versions[plan.content_hash] = plan
+            ChangeNotifier.cur.execute(
+                "insert or ignore into plan_versions values(?,?,?,?)",
+                [plan.content_hash, plan.location, str(using_date), plan.to_json()],
+            )
+
+        by_hash = ChangeNotifier.delivered.setdefault((plan.location, using_date), {})
+        for old_hash in list(by_hash):
+            by_hash[old_hash].discard(chat_id)
+            if not by_hash[old_hash]:
+                del by_hash[old_hash]
+        by_hash.setdefault(plan.content_hash, set()).add(chat_id)
+
+        ChangeNotifier.cur.execute(
+            "insert or replace into deliveries values(?,?,?,?)",
+            [chat_id, plan.location, str(using_date), plan.content_hash],
+        )
+        ChangeNotifier.con.commit()
+        Cluster().bump("notify")
+
+    async def notify_changes(self, bot, plan: Plan, using_date: date) -> None:
+        """sends a delta message to every chat that received an older version of this plan.
+        chats with a /filter get the delta of the meals their filter shows.
+        the diff is computed once per delivered version and filter, not per chat"""
+
+        self.load()
+        by_hash = ChangeNotifier.delivered.get((plan.location, using_date), {})
+
+        # nothing changed since the last delivery/refresh: nothing to do
+        if set(by_hash) <= {plan.content_hash} or not plan.is_available_for(using_date):
+            return
+
+        # filter tags → plan as chats with that filter see it
+        views = {}
+        for old_hash, chat_ids in list(by_hash.items()):
+            if old_hash == plan.content_hash or not chat_ids:
+                continue
+
+            chats_by_tags = {}
+            for chat_id in chat_ids:
+                chats_by_tags.setdefault(FilterManager().get_tags(chat_id), []).append(chat_id)
+
+            for tags, tag_chat_ids in chats_by_tags.items():
+                if tags not in views:
+                    views[tags] = plan.filtered(tags)
+                view = views[tags]
+                if view.content_hash == old_hash:
+                    continue
+
+                plan_diff = view.diff(ChangeNotifier.versions[old_hash])
+                if plan_diff:
+                    message = markdown_v2_formatter(plan_diff_to_string(plan_diff))
+                    for chat_id in tag_chat_ids:
+                        await send_tracked(
+                            bot,
+                            "delta",
+                            chat_id=chat_id,
+                            text=message,
+                            parse_mode=ParseMode.MARKDOWN_V2,
+                        )
+
+                for chat_id in tag_chat_ids:
+                    self.record_delivery(chat_id=chat_id, plan=view, using_date=using_date)
+
+
+class FilterManager:
+    """per-chat meal filters (tags, see TAG_RULES in mensa_plan.py) and keyword alerts.
+    alerts are indexed by keyword, so matching a plan against them only touches
+    the chats whose keywords actually occur in the plan's keyword index"""
+
+    con = sqlite3.connect("jobs.db")
+    cur = con.cursor()
+    loaded = False
+    # chat id → tags of meals that should be shown
+    tags = {}
+    # chat id → alert keywords, and the inverse: keyword → chat ids
+    alerts = {}
+    alert_index = {}
+    # (chat id, date) → keywords that were already alerted for that day
+    alerts_sent = {}
+    # (location, date) → hash of the plan version alerts were last matched against
+    matched_versions = {}
+    # day of the last load/prune, sent alerts of earlier days are dropped once it changes
+    day = None
+
+    def load(self) -> None:
+        """creates tables if necessary and restores filters, alerts and sent alerts"""
+
+        if FilterManager.loaded:
+            if FilterManager.day != date.today():
+                self.prune()
+            return
+
+        FilterManager.cur.execute(
+            "create table if not exists filters(id, kind, value, unique(id, kind, value))"
+        )
+        FilterManager.cur.execute(
+            "create table if not exists alerts_sent(id, date, keyword, unique(id, date, keyword))"
+        )
+        FilterManager.cur.execute("delete from alerts_sent where date < ?", [str(date.today())])
+        FilterManager.con.commit()
+
+        for chat_id, kind, value in FilterManager.cur.execute(
+            "select id, kind, value from filters"
+        ).fetchall():
+            if kind == "tag":
+                FilterManager.tags.setdefault(chat_id, set()).add(value)
+            else:
+                self._index_alert(chat_id, value)
+
+        for chat_id, alert_date, keyword in FilterManager.cur.execute(
+            "select id, date, keyword from alerts_sent"
+        ).fetchall():
+            FilterManager.alerts_sent.setdefault(
+                (chat_id, date.fromisoformat(alert_date)), set()
+            ).add(keyword)
+
+        FilterManager.day = date.today()
+        FilterManager.loaded = True
+
+    def prune(self) -> None:
+        """drops sent alerts and matched plan versions of past days"""
+
+        FilterManager.cur.execute("delete from alerts_sent where date < ?", [str(date.today())])
+        FilterManager.con.commit()
+
+        for key in [key for key in FilterManager.alerts_sent if key[1] < date.today()]:
+            del FilterManager.alerts_sent[key]
+        for key in [key for key in FilterManager.matched_versions if key[1] < date.today()]:
+            del FilterManager.matched_versions[key]
+
+        FilterManager.day = date.today()
+
+    def reload(self) -> None:
+        """discards filters, alerts and sent alerts and loads them again from jobs.db
+        (cluster mode: picks up changes made by other workers)"""
+
+        FilterManager.tags = {}
+        FilterManager.alerts = {}
+        FilterManager.alert_index = {}
+        FilterManager.alerts_sent = {}
+        FilterManager.loaded = False
+        self.load()
+
+    def get_tags(self, chat_id: int) -> frozenset:
+        """tags the chat filters for (empty: show everything)"""
+
+        self.load()
+        return frozenset(FilterManager.tags.get(chat_id, ()))
+
+    def set_tags(self, chat_id: int, tags) -> None:
+        """replaces the chat's filter. an empty set removes it"""
+
+        self.load()
+        FilterManager.cur.execute("delete from filters where id = ? and kind = 'tag'", [chat_id])
+        FilterManager.cur.executemany(
+            "insert into filters values(?,'tag',?)", [(chat_id, tag) for tag in tags]
+        )
+        FilterManager.con.commit()
+        Cluster().bump("filters")
+
+        if tags:
+            FilterManager.tags[chat_id] = set(tags)
+        else:
+            FilterManager.tags.pop(chat_id, None)
+
+    def get_alerts(self, chat_id: int) -> set:
+        """keywords the chat wants alerts for"""
+
+        self.load()
+        return set(FilterManager.alerts.get(chat_id, ()))
+
+    def has_alerts(self) -> bool:
+        """whether any chat has alert keywords"""
+
+        self.load()
+        return bool(FilterManager.alert_index)
+
+    def add_alert(self, chat_id: int, keyword: str) -> None:
+        """adds a keyword (lowercase single word) for the chat"""
+
+        self.load()
+        FilterManager.cur.execute(
+            "insert or ignore into filters values(?,'alert',?)", [chat_id, keyword]
+        )
+        FilterManager.con.commit()
+        Cluster().bump("filters")
+        self._index_alert(chat_id, keyword)
+
+    def clear_alerts(self, chat_id: int) -> None:
+        """removes all keywords of the chat"""
+
+        self.load()
+        FilterManager.cur.execute("delete from filters where id = ? and kind = 'alert'", [chat_id])
+        FilterManager.con.commit()
+        Cluster().bump("filters")
+
+        for keyword in FilterManager.alerts.pop(chat_id, set()):
+            FilterManager.alert_index[keyword].discard(chat_id)
+            if not FilterManager.alert_index[keyword]:
+                del FilterManager.alert_index[keyword]
+
+    def match_alerts(self, plan: Plan) -> dict:
+        """{chat id: matching keywords} for all chats with a keyword in the plan.
+        iterates over the smaller one of the two keyword sets, everything else is set lookups"""
+
+        self.load()
+        if len(FilterManager.alert_index) <= len(plan.keyword_index):
+            keywords = [kw for kw in FilterManager.alert_index if kw in plan.keyword_index]
+        else:
+            keywords = [kw for kw in plan.keyword_index if kw in FilterManager.alert_index]
+
+        matches = {}
+        for keyword in keywords:
+            for chat_id in FilterManager.alert_index[keyword]:
+                matches.setdefault(chat_id, set()).add(keyword)
+
+        return matches
+
+    async def send_alerts(self, bot, plan: Plan, using_date: date) -> None:
+        """sends an alert for every keyword that newly appeared in the plan of using_date.
+        does nothing if alerts were already matched against this plan version"""
+
+        self.load()
+        key = (plan.location, using_date)
+        if not plan.is_available_for(using_date):
+            return
+        if FilterManager.matched_versions.get(key) == plan.content_hash:
+            return
+        FilterManager.matched_versions[key] = plan.content_hash
+
+        for chat_id, keywords in self.match_alerts(plan).items():
+            already_sent = FilterManager.alerts_sent.setdefault((chat_id, using_date), set())
+            new_keywords = keywords - already_sent
+            if not new_keywords:
+                continue
+
+            message = markdown_v2_formatter(alert_to_string(plan, new_keywords))
+            if not await send_tracked(
+                bot, "alert", chat_id=chat_id, text=message, parse_mode=ParseMode.MARKDOWN_V2
+            ):
+                continue
+
+            already_sent |= new_keywords
+            FilterManager.cur.executemany(
+                "insert or ignore into alerts_sent values(?,?,?)",
+                [(chat_id, str(using_date), keyword) for keyword in new_keywords],
+            )
+            FilterManager.con.commit()
+            Cluster().bump("filters")
+
+    def _index_alert(self, chat_id: int, keyword: str) -> None:
+        FilterManager.alerts.setdefault(chat_id, set()).add(keyword)
+        FilterManager.alert_index.setdefault(keyword, set()).add(chat_id)
+
+
+def alert_to_string(plan: Plan, keywords) -> str:
+    """formats an alert: the meals of the plan that contain one of the keywords"""
+
+    positions = set()
+    for keyword in keywords:
+        positions |= plan.keyword_index[keyword]
+
+    sub_message = f"_Alarm ({', '.join(sorted(keywords))}): {plan.date_label}_\n"
+    for group_index, meal_index in sorted(positions):
+        meal_group = plan.meal_groups[group_index]
+        meal = meal_group.meals[meal_index]
+        sub_message += f"\n •__ {meal.name}__ ({meal_group.type})\n   {meal.prices}\n"
+
+    return sub_message
+
+
+def plan_diff_to_string(plan_diff: PlanDiff) -> str:
+    """formats the changes to a plan that was already delivered"""
+
+    plan = plan_diff.plan
+    new_meals = plan.meals_by_key()
+    sub_message = f"_Planänderung {plan.date_label}_\n"
+
+    if plan_diff.added:
+        sub_message += "\n*Neu:*\n"
+        for meal_type, name in plan_diff.added:
+            sub_message += f" •__ {name}__ ({meal_type})\n"
+            sub_message += "   " + new_meals[(meal_type, name)].prices + "\n"
+
+    if plan_diff.changed:
+        sub_message += "\n*Geändert:*\n"
+        for meal_type, name in plan_diff.changed:
+            meal = new_meals[(meal_type, name)]
+            sub_message += f" •__ {name}__ ({meal_type})\n"
+            for ingredient in meal.additional_ingredients:
+                sub_message += "     + _" + ingredient + "_\n"
+            sub_message += "   " + meal.prices + "\n"
+
+    if plan_diff.removed:
+        sub_message += "\n*Entfällt:*\n"
+        for meal_type, name in plan_diff.removed:
+            sub_message += f" •__ {name}__ ({meal_type})\n"
+
+    sub_message += "\n < /heute >"
+
+    return sub_message
+
+
+def mensa_data_to_string(plan: Plan, using_date, tags=frozenset()) -> str:
+    """formats a plan returned by the fetch backend / PlanStore.
     Also check the date of returned data, since the site falls back to
-    current date instead of requested date if it is too far in the future"""
+    current date instead of requested date if it is too far in the future.
+    If tags are given (/filter), only meals with at least one of them are shown"""
 
     sub_message = ""
 
     # when a date is requested that is too far in the future, the site will load the current date
-    # therefore, if the date reported by the site (inside data{})
-    # is != using_date, no plan for that date is available.
-    if len(mensa_data[0]) == 1 or mensa_data[0]["date"].split(",")[
-        1
-    ].strip() != using_date.strftime("%d.%m.%Y"):
+    # therefore, if the date reported by the site is != using_date,
+    # no plan for that date is available.
+    if not plan.is_available_for(using_date):
         sub_message += "Für diesen Tag existiert noch kein Plan.\n"
 
     else:
-        # generating sub_message from spider results
-        for meal_group in mensa_data[0]['meal_groups']:
-
-            # checking if all sub
-            price_is_shared = True
-            price_first_submeal = meal_group['sub_meals'][0]['prices']
-
-            for sub_meal in meal_group['sub_meals']:
-                if sub_meal['prices'] != price_first_submeal:
-                    price_is_shared = False
-                    break
-
-            # meal["type"]: vegetarian/meat/free choice
-            sub_message += "\n*" + meal_group["type"] + ":*\n"
-            
-            # meal name (will break for multi-item dishes)
-            
-            for sub_meal in meal_group["sub_meals"]:
-                # if maybe_shared_price is None:
-                #     maybe_shared_price = sub_meal["prices"]
-                sub_message += " •__ " + sub_meal["name"] + "__\n"
+        # positions of the meals that pass the filter (None: no filter)
+        visible = plan.positions_with_tags(tags) if tags else None
+
+        if visible is not None:
+            sub_message += "_Filter: " + ", ".join(sorted(tags)) + "_\n"
+            if not visible:
+                sub_message += "\nKeine passenden Gerichte.\n"
+
+        for group_index, meal_group in enumerate(plan.meal_groups):
+            meals = [
+                meal
+                for meal_index, meal in enumerate(meal_group.meals)
+                if visible is None or (group_index, meal_index) in visible
+            ]
+            if not meals:
+                continue
+
+            # meal_group.type: vegetarian/meat/free choice
+            sub_message += "\n*" + meal_group.type + ":*\n"
+
+            for meal in meals:
+                sub_message += " •__ " + meal.name + "__\n"
 
                 # add. ingredients
-                for ingredient in sub_meal["additional_ingredients"]:
+                for ingredient in meal.additional_ingredients:
                     sub_message += "     + _" + ingredient + "_\n"
-            
+
                 # prices for sub-meals printed individually if they are NOT all the same
-                if not price_is_shared: 
-                    sub_message += "   " + sub_meal["prices"] + "\n"
-            
+                if not meal_group.price_is_shared:
+                    sub_message += "   " + meal.prices + "\n"
+
             # one price if all subitems cost the same
-            if price_is_shared:
-                sub_message += "   " + sub_meal["prices"] + "\n"
+            if meal_group.price_is_shared:
+                sub_message += "   " + meals[0].prices + "\n"
 
     return sub_message
 
 
-def generate_mensa_message(input_date: date, user_aware_future_day: bool = False):
-    """First, day of week in input_date is evaluated: if Saturday/Sunday,
-    override date to next monday and add a notice to the message that the day was overridden.
-    That message is only added if user_aware_future_day is not True
-
-    Then, mensa crawler is called for selected date. If returned data is actually for that date,
-    that data will be parsed and appended to message"""
+def resolve_date(input_date: date, user_aware_future_day: bool = False) -> tuple[date, str]:
+    """day of week in input_date is evaluated: if Saturday/Sunday,
+    override date to next monday and add a notice to the header that the day was overridden.
+    That notice is only added if user_aware_future_day is not True.
+    Returns the date whose plan is shown, and the message header"""
 
-    message = ""
+    header = ""
     weekdays = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag"]
 
-    # the Mensa ID to crawl
-    mensen_ids = {
-        # "Alle Mensen": "all", ### currently unsupported
-        "Dittrichring": 153,
-        "Botanischen Garten": 127,
-        "Academica": 118,
-        "am Park": 106,
-        "Elsterbecken": 115,
-        "Medizincampus": 162,
-        "Peterssteinweg": 111,
-        "Schoenauer Str": 140,
-        "Tierklinik": 170,
-    }
-    location = mensen_ids["am Park"]
-
     # Heute ist Mo-Fr (fooden)
     if input_date.isoweekday() <= 5:
         using_date = input_date
-        message += (
+        header += (
             "_"
             + weekdays[using_date.isoweekday() - 1]
             + using_date.strftime(", %d.%m.%Y")
@@ -415,46 +1486,61 @@ def generate_mensa_message(input_date: date, user_aware_future_day: bool = False
     # Samstag → Plan für übermorgen laden
     elif input_date.isoweekday() == 6:
         using_date = input_date + timedelta(days=2)
-        message += (
+        header += (
             "_"
             + weekdays[using_date.isoweekday() - 1]
             + using_date.strftime(", %d.%m.%Y")
         )
         if user_aware_future_day:
-            message += "_\n"
+            header += "_\n"
         else:
-            message += " (Übermorgen)_\n"
+            header += " (Übermorgen)_\n"
 
     # Sonntag → Plan für morgen laden
     elif input_date.isoweekday() == 7:
         using_date = input_date + timedelta(days=1)
-        message += (
+        header += (
             "_"
             + weekdays[using_date.isoweekday() - 1]
             + using_date.strftime(", %d.%m.%Y")
         )
 
         if user_aware_future_day:
-            message += "_\n"
+            header += "_\n"
         else:
-            message += " (Morgen)_\n"
+            header += " (Morgen)_\n"
 
-    job = Job(
-        MensaSpider,
-        start_urls=[
-            (
-                "https://www.studentenwerk-leipzig.de/mensen-cafeterien/speiseplan"
-                f"?location={str(location)}&date={str(using_date)}"
-            )
-        ],
-    )
-    processor = Processor(settings=None)
-    mensa_data = processor.run(job)
-    formatted_mensa_data = mensa_data_to_string(
-        mensa_data=mensa_data, using_date=using_date
-    )
+    return using_date, header
+
+
+async def generate_mensa_message(
+    input_date: date,
+    user_aware_future_day: bool = False,
+    location: int = DEFAULT_LOCATION,
+    tags=frozenset(),
+) -> tuple[str, Plan]:
+    """First, the date to show is resolved (weekends → next monday, see resolve_date).
+
+    Then, the plan for selected date is taken from PlanStore (which fetches it if necessary).
+    If returned data is actually for that date, that data will be formatted
+    and appended to message. Returns the message and the plan it shows"""
 
-    message += formatted_mensa_data
+    using_date, header = resolve_date(input_date, user_aware_future_day=user_aware_future_day)
+    plan = await PlanStore().get_plan(location=location, using_date=using_date)
+
+    return plan_message(plan=plan, using_date=using_date, header=header, tags=tags), plan
+
+
+def plan_message(plan: Plan, using_date: date, header: str, tags=frozenset()) -> str:
+    """complete (escaped) message for a plan: header, location (if not the default one),
+    meals and command footer"""
+
+    message = header
+
+    if plan.location != DEFAULT_LOCATION:
+        message += "_Mensa " + LOCATION_NAMES[plan.location] + "_\n"
+
+    message += mensa_data_to_string(plan=plan, using_date=using_date, tags=tags)
 
     message += "\n < /heute >  < /morgen >"
     message += "\n < /uebermorgen >"
@@ -463,6 +1549,51 @@ def generate_mensa_message(input_date: date, user_aware_future_day: bool = False
     return message
 
 
+def plan_keyboard(using_date: date, location: int) -> InlineKeyboardMarkup:
+    """buttons below a plan message: previous/next weekday and location picker.
+    days before today aren't offered, their plans are not kept (see PlanStore.put)"""
+
+    previous_day = using_date - timedelta(days=3 if using_date.isoweekday() == 1 else 1)
+    next_day = using_date + timedelta(days=3 if using_date.isoweekday() == 5 else 1)
+
+    day_buttons = [
+        InlineKeyboardButton(
+            next_day.strftime("%d.%m.") + " ▶",
+            callback_data=f"plan:{next_day}:{location}",
+        )
+    ]
+    if previous_day >= date.today():
+        day_buttons.insert(
+            0,
+            InlineKeyboardButton(
+                "◀ " + previous_day.strftime("%d.%m."),
+                callback_data=f"plan:{previous_day}:{location}",
+            ),
+        )
+
+    return InlineKeyboardMarkup(
+        [
+            day_buttons,
+            [
+                InlineKeyboardButton(
+                    "📍 " + LOCATION_NAMES[location],
+                    callback_data=f"mensen:{using_date}:{location}",
+                )
+            ],
+        ]
+    )
+
+
+def location_keyboard(using_date: date) -> InlineKeyboardMarkup:
+    """buttons to pick the location whose plan is shown, two per row"""
+
+    buttons = [
+        InlineKeyboardButton(name, callback_data=f"plan:{using_date}:{location}")
+        for name, location in MENSEN_IDS.items()
+    ]
+    return InlineKeyboardMarkup([buttons[i : i + 2] for i in range(0, len(buttons), 2)])
+
+
 def markdown_v2_formatter(text: str) -> str:
     """used for escaping special Markdown V2 characters using backslash.
     can only be used for strings that should not contain formatting,
@@ -503,6 +1634,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /unsubscribe: automatische Nachrichten deaktivieren.
 /heute: manuell aktuelles Angebot anzeigen.
 /morgen: morgiges Angebot anzeigen.
+/aenderungen an: Änderungen am Plan nach dem automatischen Senden erhalten.
+/filter vegetarisch: nur vegetarische Gerichte anzeigen.
+/alarm Schnitzel: Nachricht, sobald ein Gericht mit Schnitzel auf dem Plan steht.
 
 Wenn /heute oder /morgen kein Wochentag ist, wird der Plan für Montag angezeigt.
     """
@@ -585,7 +1719,7 @@ async def changetime(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     job_manager = JobManager()
 
-    current_time = job_manager.get_job_times()
+    current_time = job_manager.get_job_time(chat_id)
 
     if current_time is None:
         message = (
@@ -624,10 +1758,15 @@ async def heute(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Telegram command to manually get today's available meals
     Command: '/heute'"""
 
-    message = generate_mensa_message(date.today())
+    message, _ = await generate_mensa_message(
+        date.today(), tags=FilterManager().get_tags(update.effective_chat.id)
+    )
 
     await context.bot.send_message(
-        chat_id=update.effective_chat.id, text=message, parse_mode=ParseMode.MARKDOWN_V2
+        chat_id=update.effective_chat.id,
+        text=message,
+        parse_mode=ParseMode.MARKDOWN_V2,
+        reply_markup=plan_keyboard(resolve_date(date.today())[0], DEFAULT_LOCATION),
     )
 
 
@@ -635,11 +1774,17 @@ async def morgen(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Telegram command to manually get tomorrows available meals
     Command: '/morgen'"""
 
-    message = generate_mensa_message(
-        date.today() + timedelta(days=1), user_aware_future_day=True
+    input_date = date.today() + timedelta(days=1)
+    message, _ = await generate_mensa_message(
+        input_date,
+        user_aware_future_day=True,
+        tags=FilterManager().get_tags(update.effective_chat.id),
     )
     await context.bot.send_message(
-        chat_id=update.effective_chat.id, text=message, parse_mode=ParseMode.MARKDOWN_V2
+        chat_id=update.effective_chat.id,
+        text=message,
+        parse_mode=ParseMode.MARKDOWN_V2,
+        reply_markup=plan_keyboard(resolve_date(input_date)[0], DEFAULT_LOCATION),
     )
 
 
@@ -647,49 +1792,380 @@ async def uebermorgen(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     """Telegram command to manually get meals 2 days in the future
     Commands: '/uebermorgen' '/ubermorgen'"""
 
-    message = generate_mensa_message(
-        date.today() + timedelta(days=2), user_aware_future_day=True
+    input_date = date.today() + timedelta(days=2)
+    message, _ = await generate_mensa_message(
+        input_date,
+        user_aware_future_day=True,
+        tags=FilterManager().get_tags(update.effective_chat.id),
     )
     await context.bot.send_message(
-        chat_id=update.effective_chat.id, text=message, parse_mode=ParseMode.MARKDOWN_V2
+        chat_id=update.effective_chat.id,
+        text=message,
+        parse_mode=ParseMode.MARKDOWN_V2,
+        reply_markup=plan_keyboard(resolve_date(input_date)[0], DEFAULT_LOCATION),
     )
 
 
+async def navigate(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """callback of the buttons below plan messages (see plan_keyboard): shows another
+    day or location by editing the message. Answered from the plan cache,
+    only fetches if that plan has never been cached"""
+
+    query = update.callback_query
+    action, plan_date, location = query.data.split(":")
+    using_date = date.fromisoformat(plan_date)
+    location = int(location)
+
+    # buttons of older messages may still point to past days
+    if action == "plan" and using_date < date.today():
+        await query.answer("Vergangene Tage sind nicht mehr verfügbar.")
+        return
+
+    await query.answer()
+
+    if action == "mensen":
+        await query.edit_message_reply_markup(reply_markup=location_keyboard(using_date))
+        return
+
+    plan_store = PlanStore()
+    plan = plan_store.get_cached(location=location, using_date=using_date)
+    if plan is None:
+        plan = await plan_store.get_plan(location=location, using_date=using_date)
+
+    # messages sent via inline mode have no chat, and therefore no filter
+    tags = FilterManager().get_tags(query.message.chat.id) if query.message else frozenset()
+
+    try:
+        await query.edit_message_text(
+            text=plan_message(
+                plan=plan,
+                using_date=using_date,
+                header=resolve_date(using_date)[1],
+                tags=tags,
+            ),
+            parse_mode=ParseMode.MARKDOWN_V2,
+            reply_markup=plan_keyboard(using_date, location),
+        )
+    except BadRequest as exc:
+        # e.g. the location that is already shown was picked again
+        if "not modified" not in exc.message:
+            raise
+
+
+async def inline_plan(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """inline mode: '@bot [heute|morgen|uebermorgen] [Mensa]' in any chat.
+    Answered only from the plan cache, without filters. Plans that aren't cached yet
+    are fetched in the background, so they are available for the next query.
+    Until then a placeholder is shown, and Telegram must not cache the answer"""
+
+    words = update.inline_query.query.lower().split()
+    offsets = [INLINE_DAYS[word] for word in words if word in INLINE_DAYS] or [0, 1, 2]
+
+    location = DEFAULT_LOCATION
+    location_query = " ".join(word for word in words if word not in INLINE_DAYS)
+    if location_query:
+        for name, location_id in MENSEN_IDS.items():
+            if location_query in name.lower():
+                location = location_id
+                break
+
+    plan_store = PlanStore()
+    results = {}
+    complete = True
+    for offset in offsets:
+        using_date, header = resolve_date(
+            date.today() + timedelta(days=offset), user_aware_future_day=offset > 0
+        )
+        plan = plan_store.get_cached(location=location, using_date=using_date)
+
+        if plan is None:
+            context.application.create_task(
+                plan_store.get_plan(location=location, using_date=using_date)
+            )
+            complete = False
+            results[f"{location}:{using_date}"] = InlineQueryResultArticle(
+                id=f"{location}:{using_date}:loading",
+                title=header.strip().strip("_") + " · " + LOCATION_NAMES[location],
+                description="Plan wird geladen…",
+                input_message_content=InputTextMessageContent(
+                    markdown_v2_formatter(
+                        header + "Plan wird geladen…\n\n < /heute >  < /morgen >"
+                        "\n < /uebermorgen >"
+                    ),
+                    parse_mode=ParseMode.MARKDOWN_V2,
+                ),
+            )
+            continue
+
+        meal_names = [meal.name for meal_group in plan.meal_groups for meal in meal_group.meals]
+        results[f"{location}:{using_date}"] = InlineQueryResultArticle(
+            id=f"{location}:{using_date}",
+            title=header.strip().strip("_") + " · " + LOCATION_NAMES[location],
+            description=", ".join(meal_names) if plan.is_available_for(using_date) else "kein Plan",
+            input_message_content=InputTextMessageContent(
+                plan_message(plan=plan, using_date=using_date, header=header),
+                parse_mode=ParseMode.MARKDOWN_V2,
+            ),
+            reply_markup=plan_keyboard(using_date, location),
+        )
+
+    # an incomplete answer would otherwise be served by Telegram for a minute
+    await update.inline_query.answer(list(results.values()), cache_time=60 if complete else 0)
+
+
 async def send_mealjob_time(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """(debug) Telegram command that sends the time at which todays meal will be sent.
+    """Telegram command that sends the time at which todays meal will be sent (to this chat).
     Command: '/when'"""
 
     chat_id = update.effective_chat.id
     job_manager = JobManager()
 
-    job_time = job_manager.get_job_times()
+    job_time = job_manager.get_job_time(chat_id)
     if job_time is not None:
-        message = job_time
+        message = f"Plan wird an Wochentagen {job_time} gesendet."
     else:
         message = "Plan wird nicht automatisch gesendet"
 
-    # print(JobManager.loaded_jobs[0])
+    await context.bot.send_message(
+        chat_id=chat_id, text=message, parse_mode=ParseMode.MARKDOWN
+    )
+
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """(admin) Telegram command that sends aggregated operational stats.
+    Command: '/stats'"""
+
+    chat_id = update.effective_chat.id
+    if not is_admin(chat_id):
+        return
+
+    await context.bot.send_message(chat_id=chat_id, text=Stats().summary())
+
+
+async def aenderungen(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Telegram command to enable/disable messages about changes to today's plan
+    after it was sent automatically.
+    Command: '/aenderungen [an|aus]'"""
+
+    chat_id = update.effective_chat.id
+    notifier = ChangeNotifier()
+
+    if len(context.args) == 0:
+        if notifier.is_enabled(chat_id):
+            message = (
+                "Änderungen am heutigen Plan werden gesendet.\n/aenderungen aus zum Deaktivieren"
+            )
+        else:
+            message = (
+                "Änderungen am heutigen Plan werden nicht gesendet."
+                "\n/aenderungen an zum Aktivieren"
+            )
+
+    elif context.args[0] == "an":
+        notifier.set_enabled(chat_id, True)
+        message = (
+            "Wenn sich der Plan nach dem automatischen Senden noch ändert, "
+            "werden ab jetzt die Änderungen gesendet."
+        )
+
+    elif context.args[0] == "aus":
+        notifier.set_enabled(chat_id, False)
+        message = "Änderungen am Plan werden nicht mehr gesendet."
+
+    else:
+        message = "/aenderungen an oder /aenderungen aus"
 
     await context.bot.send_message(
         chat_id=chat_id, text=message, parse_mode=ParseMode.MARKDOWN
     )
 
 
+async def filter_meals(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Telegram command to only show meals with certain tags (e.g. vegetarian),
+    in commands and automatic messages.
+    Command: '/filter [tag ...|aus]'"""
+
+    chat_id = update.effective_chat.id
+    filter_manager = FilterManager()
+    available = ", ".join(TAG_RULES)
+
+    if len(context.args) == 0:
+        tags = filter_manager.get_tags(chat_id)
+        if tags:
+            message = f"Aktiver Filter: {', '.join(sorted(tags))}\n/filter aus zum Deaktivieren"
+        else:
+            message = f"Kein Filter aktiv.\nVerfügbar: {available}\nBeispiel: /filter vegetarisch"
+
+    elif context.args[0].lower() == "aus":
+        filter_manager.set_tags(chat_id, set())
+        message = "Filter deaktiviert, es werden wieder alle Gerichte angezeigt."
+
+    else:
+        tags = {arg.lower() for arg in context.args}
+        unknown = tags - TAG_RULES.keys()
+        if unknown:
+            message = f"Unbekannter Filter: {', '.join(sorted(unknown))}\nVerfügbar: {available}"
+        else:
+            filter_manager.set_tags(chat_id, tags)
+            message = (
+                f"Es werden nur noch Gerichte angezeigt, die {' oder '.join(sorted(tags))} sind."
+            )
+            if tags & {"vegetarisch", "vegan"}:
+                message += "\n(nur Gerichte, die im Speiseplan als solche gekennzeichnet sind)"
+
+    await context.bot.send_message(chat_id=chat_id, text=message)
+
+
+async def alarm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Telegram command to get a message as soon as a meal containing a word
+    (e.g. 'Schnitzel') appears in one of the next plans.
+    Command: '/alarm [Wort|aus]'"""
+
+    chat_id = update.effective_chat.id
+    filter_manager = FilterManager()
+
+    if len(context.args) == 0:
+        keywords = filter_manager.get_alerts(chat_id)
+        if keywords:
+            message = f"Alarm für: {', '.join(sorted(keywords))}\n/alarm aus zum Deaktivieren"
+        else:
+            message = "Kein Alarm aktiv.\nBeispiel: /alarm Schnitzel"
+
+    elif context.args[0].lower() == "aus":
+        filter_manager.clear_alerts(chat_id)
+        message = "Alle Alarme wurden gelöscht."
+
+    elif len(context.args) > 1 or not WORD_PATTERN.fullmatch(context.args[0]):
+        message = "Bitte genau ein Wort angeben, z.B. /alarm Schnitzel"
+
+    else:
+        keyword = context.args[0].lower()
+        filter_manager.add_alert(chat_id, keyword)
+        message = f"Alarm für '{keyword}' aktiviert."
+
+    await context.bot.send_message(chat_id=chat_id, text=message)
+
+
 # used as callback when called automatically (daily)
 async def job_send_today_meals(context: ContextTypes.DEFAULT_TYPE) -> None:
     """callback job that fetches, formats and sends todays meals
     to appropriate user at chosen time of day"""
 
-    message = generate_mensa_message(date.today())
+    await send_today_meals(bot=context.bot, chat_id=context.job.chat_id)
 
-    await context.bot.send_message(
-        chat_id=context.job.chat_id, text=message, parse_mode=ParseMode.MARKDOWN_V2
+
+async def send_today_meals(bot, chat_id: int) -> None:
+    """sends todays meals to the chat. in cluster mode, at most once per day across all workers"""
+
+    cluster = Cluster()
+    if not cluster.claim_delivery(chat_id, date.today()):
+        return
+
+    tags = FilterManager().get_tags(chat_id)
+    message, plan = await generate_mensa_message(date.today(), tags=tags)
+
+    delivered = await send_tracked(
+        bot,
+        "daily",
+        chat_id=chat_id,
+        text=message,
+        parse_mode=ParseMode.MARKDOWN_V2,
+        reply_markup=plan_keyboard(date.today(), DEFAULT_LOCATION),
     )
+    cluster.confirm_delivery(chat_id, date.today())
+    if not delivered:
+        return
+
+    # remember the delivered version (as far as the chat's filter shows it) for /aenderungen
+    notifier = ChangeNotifier()
+    if notifier.is_enabled(chat_id):
+        notifier.record_delivery(chat_id=chat_id, plan=plan.filtered(tags), using_date=date.today())
+
+
+async def job_heartbeat(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """cluster mode: repeating job that keeps this worker's membership alive, follows
+    leadership and subscription changes, and delivers the plans a dead worker missed"""
+
+    cluster = Cluster()
+    was_leader = cluster.is_leader()
+    membership_changed, departed = cluster.heartbeat()
+    await follow_leadership(context.application)
+
+    # only reloading what another worker changed
+    job_manager = JobManager()
+    if cluster.changed("chatids") or membership_changed:
+        job_manager.sync()
+    # a new leader needs the deliveries and sent alerts recorded by the old one
+    if cluster.changed("notify") or (cluster.is_leader() and not was_leader):
+        ChangeNotifier().reload()
+    if cluster.changed("filters") or (cluster.is_leader() and not was_leader):
+        FilterManager().reload()
+
+    if cluster.is_leader():
+        for location, using_date in cluster.take_refresh_requests():
+            context.application.create_task(
+                PlanStore().refresh(location=location, using_date=using_date)
+            )
+
+    if departed:
+        # the dead workers' chats were nobody's since their last heartbeat, and deliveries
+        # they claimed but didn't finish are still open, whenever they were due.
+        # sent in the background, so the heartbeats continue meanwhile
+        chat_ids = cluster.undelivered(job_manager.due_today(), departed, date.today())
+        context.application.create_task(catch_up_deliveries(bot=context.bot, chat_ids=chat_ids))
+
+
+async def catch_up_deliveries(bot, chat_ids: list) -> None:
+    """sends todays meals to the chats (of those) this worker owns now,
+    unless they already received them"""
+
+    for chat_id in chat_ids:
+        if Cluster().owns(chat_id):
+            await send_today_meals(bot=bot, chat_id=chat_id)
+
+
+async def job_refresh_plans(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """repeating job that re-fetches plans that someone is waiting for:
+    today's plan if it was delivered to chats that want changes (/aenderungen),
+    and the plans of the next days if there are keyword alerts (/alarm).
+    Otherwise it just keeps the next days' plans cached.
+    in cluster mode, only the leader runs it"""
+
+    if not Cluster().is_leader():
+        return
+
+    today = date.today()
+    notifier = ChangeNotifier()
+    filter_manager = FilterManager()
+
+    for using_date in (today + timedelta(days=offset) for offset in range(3)):
+        if using_date.isoweekday() > 5:
+            continue
+
+        check_changes = using_date == today and notifier.has_deliveries(DEFAULT_LOCATION, today)
+        if not check_changes and not filter_manager.has_alerts():
+            # keeps the cache warm for buttons, inline mode and the other workers.
+            # fetches ahead of expiry, so the plan never gets older than plan_max_age
+            await PlanStore().get_plan(
+                location=DEFAULT_LOCATION,
+                using_date=using_date,
+                max_age=max(0, int(CONFIG["plan_max_age"]) - int(CONFIG["refresh_interval"])),
+            )
+            continue
+
+        plan = await PlanStore().refresh(location=DEFAULT_LOCATION, using_date=using_date)
+        if check_changes:
+            await notifier.notify_changes(bot=context.bot, plan=plan, using_date=using_date)
+        await filter_manager.send_alerts(bot=context.bot, plan=plan, using_date=using_date)
 
 
 async def playwright_fetch_grades() -> list:
     """private use function: retrieves exam results from CampusDual using local creds."""
 
+    # playwright is only imported when grades are actually fetched
+    # pylint: disable=import-outside-toplevel
+    from playwright.async_api import async_playwright
+
     with open("login_creds.txt", "r", encoding="utf8") as fobj:
         uname, password = fobj.readline().strip().split(",")
 
@@ -741,10 +2217,14 @@ async def playwright_fetch_grades() -> list:
 async def job_send_new_grades(context: ContextTypes.DEFAULT_TYPE):
     """private use job that triggers retrieval of grades from CampusDual, then formats message"""
 
-    if not context.job.chat_id == 578278860:
+    if not context.job.chat_id == 578278860 or not Cluster().is_leader():
         return
 
+    # pylint: disable-next=import-outside-toplevel
+    from playwright._impl._api_types import Error as PlaywrightError
+
     message = ""
+    started = datetime.now()
     try:
         grades = await playwright_fetch_grades()
 
@@ -766,10 +2246,24 @@ async def job_send_new_grades(context: ContextTypes.DEFAULT_TYPE):
             )
 
     except PlaywrightError as exc:
+        Stats().record(
+            "grade_poll",
+            ok=False,
+            error=exc.message.splitlines()[0],
+            ms=round((datetime.now() - started).total_seconds() * 1000),
+        )
         if exc.message.startswith("net::ERR_ADDRESS_UNREACHABLE"):
             logging.warning("CampusDual is likely offline:\n%s", exc.message)
         else:
             logging.warning("couldn't interact with CampusDual:\n%s", exc.message)
+        return
+
+    Stats().record(
+        "grade_poll",
+        ok=True,
+        ms=round((datetime.now() - started).total_seconds() * 1000),
+        new=bool(message),
+    )
 
 
 async def force_get_new_grades(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -779,6 +2273,9 @@ async def force_get_new_grades(update: Update, context: ContextTypes.DEFAULT_TYP
     if not update.effective_chat.id == 578278860:
         return
 
+    # pylint: disable-next=import-outside-toplevel
+    from playwright._impl._api_types import Error as PlaywrightError
+
     message = ""
     try:
         grades = await playwright_fetch_grades()
@@ -834,11 +2331,12 @@ async def acknowledge(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 if __name__ == "__main__":
+    arguments = parse_args()
     try:
-        # prevents multiple instances of this script to run at the same time
+        # prevents multiple instances of this script (per worker) to run at the same time
         # → easy way to restart in case of error
-        with PidFile():
-            main()
+        with PidFile(pidname=f"bot-{arguments.worker}" if arguments.worker else None):
+            main(arguments)
 
     # if pidfile exists ≙ program is already running: catch the pidfilelocked exc, cleanly exit
     except PidFileAlreadyLockedError:
@@ -0,0 +1,86 @@
+"""side-by-side benchmark of the fetch backends in mensa_fetch.py.
+
+fetches the same plan repeatedly with every backend (from the local stand-in speiseplan
+server in loadtest.py, or from --url) and reports latency per backend. Also checks that
+all backends return the same plan.
+
+Usage: python fetch_bench.py --runs 20 --backends http,scrapy,fixture
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time as timer
+from datetime import date
+
+from loadtest import FakeSpeiseplan, speiseplan_html
+from mensa_fetch import FETCH_BACKENDS, create_fetcher
+from mensa_stats import percentile
+
+LOCATION = 106
+
+
+async def bench_backend(config: dict, runs: int, using_date: date) -> tuple[list, dict]:
+    """fetches 'runs' times with one backend. returns latencies (ms) and the last plan"""
+
+    fetcher = create_fetcher(config)
+    latencies = []
+    plan = None
+
+    try:
+        for _ in range(runs):
+            started = timer.perf_counter()
+            plan = await fetcher.fetch(location=LOCATION, using_date=using_date)
+            latencies.append((timer.perf_counter() - started) * 1000)
+    finally:
+        await fetcher.close()
+
+    return latencies, plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("--runs", type=int, default=10, help="fetches per backend")
+    parser.add_argument(
+        "--backends", default=",".join(FETCH_BACKENDS), help="comma separated backend names"
+    )
+    parser.add_argument("--url", help="speiseplan URL (default: local stand-in server)")
+    args = parser.parse_args()
+
+    using_date = date.today()
+    speiseplan = None
+    if args.url is None:
+        speiseplan = FakeSpeiseplan().start()
+
+    fixture_dir = tempfile.mkdtemp(prefix="mensa-fixtures-")
+    with open(
+        os.path.join(fixture_dir, f"{LOCATION}_{using_date}.html"), "w", encoding="utf8"
+    ) as fobj:
+        fobj.write(speiseplan_html(str(using_date)))
+
+    plans = {}
+    for backend in args.backends.split(","):
+        config = {
+            "fetch_backend": backend,
+            "speiseplan_url": args.url or speiseplan.url,
+            "fixture_dir": fixture_dir,
+        }
+        latencies, plans[backend] = asyncio.run(bench_backend(config, args.runs, using_date))
+        latencies.sort()
+        print(
+            f"{backend:8} median {statistics.median(latencies):8.1f} ms   "
+            f"p95 {percentile(latencies, 95):8.1f} ms   max {latencies[-1]:8.1f} ms"
+        )
+
+    if speiseplan is not None:
+        speiseplan.stop()
+
+    reference = next(iter(plans.values()))
+    for backend, plan in plans.items():
+        if plan != reference:
+            print(f"MISMATCH: '{backend}' returned a different plan")
+
+
+if __name__ == "__main__":
+    main()
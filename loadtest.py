@@ -0,0 +1,545 @@
+"""load-test harness for the bot. Simulates a morning with many subscribers:
+
+1. seeds a fresh jobs.db (in a scratch directory) with N synthetic chat ids,
+   spread over the next few minutes
+2. starts a local stand-in for the Telegram Bot API and for the speiseplan site
+3. runs the bot (in a child process) against both until every scheduled message
+   should have been sent
+
+and then reports startup time of JobManager.load_jobs, peak RSS, crawl count,
+send throughput and per-chat delivery lateness.
+
+with --workers, the bot runs as that many worker processes (bot.py --worker) sharing
+jobs.db instead, and the report shows how the deliveries were split between them.
+--kill-after kills one of them (the first one started, usually the leader) that many
+seconds after the first send slot, to check that its chats are neither missed nor duplicated.
+
+exits with 1 if a chat was missed or got the plan twice, or (with --workers) if the
+deliveries were split clearly unevenly between the surviving workers.
+
+Usage: python loadtest.py --subscribers 10000 --window 5
+       python loadtest.py --subscribers 3000 --workers 3 --kill-after 30
+"""
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time as timer
+from collections import Counter
+from datetime import datetime, timedelta
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from mensa_stats import percentile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+WEEKDAYS = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"]
+
+
+def speiseplan_html(plan_date: str) -> str:
+    """renders a page that looks (to the crawler) like the speiseplan for the given ISO date"""
+
+    day = datetime.strptime(plan_date, "%Y-%m-%d")
+    label = f"{WEEKDAYS[day.weekday()]}, {day.strftime('%d.%m.%Y')}"
+
+    def section(name, ingredients, prices):
+        items = "".join(f"<li>{ingredient}</li>" for ingredient in ingredients)
+        return (
+            "<section><header><div><div>"
+            f"<h4>{name}</h4><p>Preise<br>{prices}</p>"
+            f"</div></div></header><details><ul>{items}</ul></details></section>"
+        )
+
+    return (
+        "<html><body>"
+        f'<select id="edit-date"><option selected="selected">{label}</option></select>'
+        '<h3 class="title-prim">Vegetarisches Gericht</h3>'
+        '<div class="accordion u-block">'
+        + section("Gemüsecurry mit Reis", ["Koriander"], "2,50 € / 4,20 € / 5,80 €")
+        + "</div>"
+        '<h3 class="title-prim">Fleischgericht</h3>'
+        '<div class="accordion u-block">'
+        + section("Schweineschnitzel", ["Zitrone", "Pommes frites"], "3,10 € / 4,90 € / 6,40 €")
+        + section("Putenschnitzel", ["Zitrone"], "3,10 € / 4,90 € / 6,40 €")
+        + "</div>"
+        '<h3 class="title-prim">Pastateller</h3>'
+        '<div class="accordion u-block">'
+        + section("Spaghetti Bolognese", [], "2,90 € / 4,60 € / 6,10 €")
+        + "</div>"
+        "</body></html>"
+    )
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    """request handler base that doesn't log every request to stderr"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def reply(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # client went away during shutdown
+            pass
+
+
+class FakeServer:
+    """runs a ThreadingHTTPServer on a free local port in a background thread"""
+
+    def __init__(self, handler):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.server.owner = self
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class FakeSpeiseplan(FakeServer):
+    """stand-in for the Studentenwerk speiseplan page. counts every crawl"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.crawls = 0
+        super().__init__(_SpeiseplanHandler)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/speiseplan"
+
+
+class _SpeiseplanHandler(_QuietHandler):
+    def do_GET(self):  # pylint: disable=invalid-name
+        owner = self.server.owner
+        with owner.lock:
+            owner.crawls += 1
+
+        query = parse_qs(urlparse(self.path).query)
+        plan_date = query.get("date", [datetime.now().strftime("%Y-%m-%d")])[0]
+        self.reply(200, speiseplan_html(plan_date).encode("utf8"), "text/html; charset=utf-8")
+
+
+class FakeTelegramAPI(FakeServer):
+    """stand-in for the Telegram Bot API. Answers the handful of methods the bot uses,
+    records every sendMessage with its arrival time and hands out queued updates"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (arrival time, chat id, path prefix in front of 'bot<token>')
+        self.sent = []
+        # (method, params) of every call except getUpdates and sendMessage
+        self.calls = []
+        self.pending_updates = []
+        self.update_id = 0
+        self.message_id = 0
+        super().__init__(_TelegramHandler)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    def queue_update(self, **update) -> None:
+        """makes the next getUpdates return this update (update_id is added)"""
+
+        with self.lock:
+            self.update_id += 1
+            self.pending_updates.append({"update_id": self.update_id, **update})
+
+    def queue_command(self, chat_id: int, text: str) -> None:
+        """makes the next getUpdates return a private message sent by chat_id"""
+
+        self.queue_update(
+            message={
+                "message_id": self.update_id + 1,
+                "date": int(timer.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "load"},
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+            }
+        )
+
+
+class _TelegramHandler(_QuietHandler):
+    def do_POST(self):  # pylint: disable=invalid-name
+        owner = self.server.owner
+        params = self.read_params()
+        prefix, _, method = self.path.rpartition("/")
+        prefix = prefix.rpartition("/bot")[0]
+
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Mensa", "username": "loadtest_bot"}
+
+        elif method == "getUpdates":
+            with owner.lock:
+                result, owner.pending_updates = owner.pending_updates, []
+            if not result:
+                # long polling, shortened
+                timer.sleep(min(float(params.get("timeout", 0)), 1.0))
+
+        elif method in ("sendMessage", "editMessageText"):
+            chat_id = int(params.get("chat_id", 0))
+            with owner.lock:
+                if method == "sendMessage":
+                    owner.sent.append((timer.time(), chat_id, prefix))
+                else:
+                    owner.calls.append((method, params))
+                owner.message_id += 1
+                result = {
+                    "message_id": owner.message_id,
+                    "date": int(timer.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": params.get("text", ""),
+                }
+
+        else:
+            # deleteWebhook, answerCallbackQuery, ...
+            with owner.lock:
+                owner.calls.append((method, params))
+            result = True
+
+        self.reply(200, json.dumps({"ok": True, "result": result}).encode("utf8"), "application/json")
+
+    def read_params(self) -> dict:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        content_type = self.headers.get("Content-Type", "")
+
+        if content_type.startswith("application/json"):
+            return json.loads(body or b"{}")
+
+        if content_type.startswith("multipart/form-data"):
+            message = BytesParser().parsebytes(
+                b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+            )
+            return {
+                part.get_param("name", header="content-disposition"): part.get_payload(decode=True).decode()
+                for part in message.get_payload()
+            }
+
+        return {key: values[0] for key, values in parse_qs(body.decode("utf8")).items()}
+
+
+def seed_jobs_db(path: str, subscribers: int, first_slot: datetime, window: int) -> dict:
+    """creates jobs.db with synthetic chat ids, spread evenly over 'window' minutes
+    starting at first_slot. returns {chat_id: scheduled datetime}"""
+
+    con = sqlite3.connect(path)
+    con.execute("drop table if exists chatids")
+    con.execute("CREATE TABLE chatids(id type unique, hour, min)")
+
+    schedule = {}
+    for i in range(subscribers):
+        chat_id = 10_000_000 + i
+        slot = first_slot + timedelta(minutes=i % window)
+        schedule[chat_id] = slot
+
+    con.executemany(
+        "insert into chatids values(?,?,?)",
+        [(chat_id, slot.hour, slot.minute) for chat_id, slot in schedule.items()],
+    )
+    con.commit()
+    con.close()
+
+    return schedule
+
+
+def report(results: dict) -> None:
+    """prints the collected metrics as aligned 'name: value' lines"""
+
+    width = max(len(key) for key in results)
+    for key, value in results.items():
+        if isinstance(value, float):
+            value = f"{value:.3f}"
+        print(f"{key.ljust(width)} : {value}")
+
+
+def delivery_metrics(sent: list, schedule: dict) -> dict:
+    """throughput and lateness (arrival minus scheduled time) per chat"""
+
+    first_arrival = {}
+    duplicates = 0
+    for arrival, chat_id, _ in sent:
+        if chat_id not in schedule:
+            continue
+        if chat_id in first_arrival:
+            duplicates += 1
+            continue
+        first_arrival[chat_id] = arrival
+
+    lateness = sorted(
+        arrival - schedule[chat_id].timestamp() for chat_id, arrival in first_arrival.items()
+    )
+    arrivals = sorted(first_arrival.values())
+    span = arrivals[-1] - arrivals[0] if len(arrivals) > 1 else 0.0
+
+    return {
+        "messages sent": len(sent),
+        "chats delivered": len(first_arrival),
+        "chats missed": len(schedule) - len(first_arrival),
+        "duplicate deliveries": duplicates,
+        "send throughput (msg/s)": len(arrivals) / span if span else float(len(arrivals)),
+        "lateness p50 (s)": percentile(lateness, 50),
+        "lateness p95 (s)": percentile(lateness, 95),
+        "lateness p99 (s)": percentile(lateness, 99),
+        "lateness max (s)": lateness[-1] if lateness else float("nan"),
+    }
+
+
+def first_slot_after(now: datetime, lead: int) -> datetime:
+    """first full minute that is at least 'lead' seconds away"""
+
+    slot = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    if (slot - now).total_seconds() < lead:
+        slot += timedelta(minutes=1)
+    return slot
+
+
+# runs bot.main in a child process, but with every weekday enabled (the simulated morning
+# should not depend on the weekday the test is run on) and reports how long load_jobs took
+BOT_SCRIPT = """
+import sys, time, bot
+bot.JobManager.days = tuple(range(7))
+load_jobs = bot.JobManager.load_jobs
+def timed_load_jobs(self):
+    started = time.perf_counter()
+    load_jobs(self)
+    print("load_jobs", time.perf_counter() - started, flush=True)
+bot.JobManager.load_jobs = timed_load_jobs
+bot.main(bot.parse_args())
+"""
+
+
+def spawn_bot(workdir: str, *bot_args: str, stdout=None) -> subprocess.Popen:
+    """starts bot.py (see BOT_SCRIPT) with bot_args in workdir"""
+
+    return subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-c", BOT_SCRIPT, *bot_args],
+        cwd=workdir,
+        env=dict(os.environ, PYTHONPATH=REPO_DIR),
+        stdout=stdout,
+        text=True,
+    )
+
+
+def peak_rss_mib(pid: int) -> float:
+    """peak resident set size of a running process (VmHWM), without its children"""
+
+    with open(f"/proc/{pid}/status", "r", encoding="utf8") as fobj:
+        for line in fobj:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def run(args) -> dict:
+    """runs one simulated morning with the bot in a child process and returns the metrics.
+    the stand-in servers stay in this process, so they don't count towards the bot's
+    memory and don't compete with it for the GIL"""
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="mensa-loadtest-")
+    os.makedirs(workdir, exist_ok=True)
+
+    first_slot = first_slot_after(datetime.now(), lead=args.lead)
+    schedule = seed_jobs_db(
+        os.path.join(workdir, "jobs.db"), args.subscribers, first_slot, args.window
+    )
+    morning_end = first_slot + timedelta(minutes=args.window - 1, seconds=args.grace)
+
+    telegram_api = FakeTelegramAPI().start()
+    speiseplan = FakeSpeiseplan().start()
+
+    with open(os.path.join(workdir, "token.txt"), "w", encoding="utf8") as fobj:
+        fobj.write("loadtest\n")
+    # like a real run, so events.jsonl in the workdir can be analyzed the same way
+    with open(os.path.join(workdir, "config.txt"), "w", encoding="utf8") as fobj:
+        fobj.write(
+            f"api_base_url = {telegram_api.base_url}\n"
+            f"speiseplan_url = {speiseplan.url}\n"
+            "grades_poller = off\n"
+            f"fetch_backend = {args.backend}\n"
+        )
+
+    proc = spawn_bot(workdir, stdout=subprocess.PIPE)
+    print(
+        f"{args.subscribers} subscribers from {first_slot:%H:%M} over {args.window} min, "
+        f"running until {morning_end:%H:%M:%S} (workdir {workdir})",
+        file=sys.stderr,
+    )
+    line = proc.stdout.readline()
+    if not line.startswith("load_jobs"):
+        raise RuntimeError("bot didn't start, see its output above")
+    load_jobs_seconds = float(line.split()[1])
+
+    timer.sleep(max(0.0, morning_end.timestamp() - timer.time()))
+    bot_rss = peak_rss_mib(proc.pid)
+    proc.send_signal(signal.SIGINT)
+    # rusage of the bot and the processes it started (e.g. scrapy crawls)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    telegram_api.stop()
+    speiseplan.stop()
+
+    results = {
+        "subscribers": args.subscribers,
+        "fetch backend": args.backend,
+        "load_jobs startup (s)": load_jobs_seconds,
+        "peak RSS bot (MiB)": bot_rss,
+        "peak RSS bot incl. children (MiB)": usage.ru_maxrss / 1024,
+        "crawls": speiseplan.crawls,
+    }
+    results.update(delivery_metrics(telegram_api.sent, schedule))
+    return results
+
+
+def run_workers(args) -> dict:
+    """runs one simulated morning with several worker processes and returns the metrics"""
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="mensa-loadtest-")
+    os.makedirs(workdir, exist_ok=True)
+
+    first_slot = first_slot_after(datetime.now(), lead=args.lead)
+    schedule = seed_jobs_db(
+        os.path.join(workdir, "jobs.db"), args.subscribers, first_slot, args.window
+    )
+    morning_end = first_slot + timedelta(minutes=args.window - 1, seconds=args.grace)
+
+    telegram_api = FakeTelegramAPI().start()
+    speiseplan = FakeSpeiseplan().start()
+
+    with open(os.path.join(workdir, "token.txt"), "w", encoding="utf8") as fobj:
+        fobj.write("loadtest\n")
+
+    workers = {}
+    for index in range(args.workers):
+        name = f"w{index}"
+        # the path prefix tells the stand-in API which worker sent a message
+        config_path = os.path.join(workdir, f"config-{name}.txt")
+        with open(config_path, "w", encoding="utf8") as fobj:
+            fobj.write(
+                f"api_base_url = {telegram_api.base_url[: -len('/bot')]}/{name}/bot\n"
+                f"speiseplan_url = {speiseplan.url}\n"
+                "grades_poller = off\n"
+                f"fetch_backend = {args.backend}\n"
+                "heartbeat_interval = 1\n"
+                "worker_timeout = 3\n"
+            )
+
+        workers[name] = spawn_bot(
+            workdir, "--worker", name, "--config", config_path, stdout=subprocess.DEVNULL
+        )
+        # the first worker becomes the leader
+        timer.sleep(0.5)
+
+    print(
+        f"{args.subscribers} subscribers from {first_slot:%H:%M} over {args.window} min, "
+        f"{args.workers} workers, running until {morning_end:%H:%M:%S} (workdir {workdir})",
+        file=sys.stderr,
+    )
+
+    killed = None
+    if args.kill_after is not None:
+        timer.sleep(max(0.0, first_slot.timestamp() + args.kill_after - timer.time()))
+        killed = "w0"
+        workers[killed].kill()
+        print(f"killed {killed} at {datetime.now():%H:%M:%S}", file=sys.stderr)
+
+    timer.sleep(max(0.0, morning_end.timestamp() - timer.time()))
+    for proc in workers.values():
+        proc.send_signal(signal.SIGINT)
+    for proc in workers.values():
+        proc.wait()
+
+    telegram_api.stop()
+    speiseplan.stop()
+
+    per_worker = Counter(prefix.strip("/") for _, _, prefix in telegram_api.sent)
+    results = {
+        "subscribers": args.subscribers,
+        "fetch backend": args.backend,
+        "workers": args.workers,
+        "killed worker": killed or "-",
+        "crawls": speiseplan.crawls,
+    }
+    for name in workers:
+        results[f"deliveries {name}"] = per_worker[name]
+    survivors = [per_worker[name] for name in workers if name != killed]
+    results["split imbalance (max/min)"] = (
+        max(survivors) / min(survivors) if min(survivors) else float("inf")
+    )
+    results.update(delivery_metrics(telegram_api.sent, schedule))
+    return results
+
+
+def check(results: dict, max_imbalance: float) -> list:
+    """descriptions of everything that went wrong in a run (empty: passed)"""
+
+    failures = []
+    if results["chats missed"]:
+        failures.append(f"{results['chats missed']} chats missed")
+    if results["duplicate deliveries"]:
+        failures.append(f"{results['duplicate deliveries']} duplicate deliveries")
+    if results.get("split imbalance (max/min)", 1.0) > max_imbalance:
+        failures.append(
+            f"uneven split between the workers: "
+            f"{results['split imbalance (max/min)']:.2f} > {max_imbalance:.2f}"
+        )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("--subscribers", type=int, default=1000, help="synthetic chat ids")
+    parser.add_argument("--window", type=int, default=3, help="minutes the send times span")
+    parser.add_argument(
+        "--lead", type=int, default=20, help="min. seconds between start and first send"
+    )
+    parser.add_argument(
+        "--grace", type=int, default=60, help="seconds to wait after the last send slot"
+    )
+    parser.add_argument("--workdir", help="scratch directory (default: new temp dir)")
+    parser.add_argument(
+        "--backend", default="http", help="fetch backend the bot uses (see mensa_fetch.py)"
+    )
+    parser.add_argument("--workers", type=int, help="run as that many worker processes")
+    parser.add_argument(
+        "--kill-after", type=int, help="kill one worker that many seconds after the first slot"
+    )
+    parser.add_argument(
+        "--max-imbalance",
+        type=float,
+        default=1.3,
+        help="fail if the busiest surviving worker sent more than this times the least busy one",
+    )
+    args = parser.parse_args()
+
+    results = run_workers(args) if args.workers else run(args)
+    report(results)
+
+    failures = check(results, args.max_imbalance)
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""interchangeable backends for fetching the speiseplan of one location and day.
+
+every backend extracts the same PlanDict structure (the one MensaSpider has always yielded),
+which MenuFetcher.fetch turns into a Plan:
+- ScrapyFetcher: the original scrapyscript crawl (whole twisted reactor in a subprocess per call)
+- HttpFetcher: one async HTTP request, parsed with lxml
+- FixtureFetcher: reads saved HTML pages from a directory, for tests and benchmarks
+
+the backend used by the bot is selected with 'fetch_backend' in config.txt
+"""
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from datetime import date
+
+from mensa_plan import Plan, PlanDict
+
+
+def empty_plan() -> PlanDict:
+    """plan that is returned if nothing could be extracted"""
+
+    return {"date": None, "meal_groups": []}
+
+
+def parse_speiseplan(html: str) -> PlanDict:
+    """extracts the plan from the speiseplan page using lxml.
+    mirrors MensaSpider.parse, without needing scrapy"""
+
+    # pylint: disable-next=import-outside-toplevel
+    import lxml.html
+
+    tree = lxml.html.fromstring(html)
+    result = empty_plan()
+
+    # extracted date from website, to verify if it matches requested date
+    selected_date = tree.xpath('//select[@id="edit-date"]/option[@selected="selected"]/text()')
+    if selected_date:
+        result["date"] = str(selected_date[0])
+
+    headers = tree.xpath('//h3[contains(concat(" ", normalize-space(@class), " "), " title-prim ")]')
+    for header in headers:
+        meal_group = {"type": "".join(header.xpath("text()")), "sub_meals": []}
+
+        for subitem in header.itersiblings():
+            # title-prim ≙ begin of next menu type/end of this menu
+            if dict(subitem.attrib) == {"class": "title-prim"}:
+                break
+
+            if dict(subitem.attrib) == {"class": "accordion u-block"}:
+                for section in subitem.xpath("section"):
+                    prices = section.xpath("header/div/div/p/text()[2]")
+                    meal_group["sub_meals"].append(
+                        {
+                            "name": "".join(section.xpath("header/div/div/h4/text()")),
+                            "additional_ingredients": [
+                                str(ingredient)
+                                for ingredient in section.xpath("details/ul/li/text()")
+                            ],
+                            "prices": str(prices[0]).strip() if prices else "",
+                        }
+                    )
+
+        result["meal_groups"].append(meal_group)
+
+    return result
+
+
+class FetchError(Exception):
+    """the page couldn't be fetched (as opposed to a page without a plan)"""
+
+
+class MenuFetcher(ABC):
+    """interface of all fetch backends. Backends are created once and reused for every fetch.
+    a failed fetch raises, it is never turned into an empty plan"""
+
+    def __init__(self, config: dict):
+        self.base_url = config["speiseplan_url"]
+
+    def url(self, location: int, using_date: date) -> str:
+        """speiseplan URL for a location id and date"""
+
+        return self.base_url + f"?location={str(location)}&date={str(using_date)}"
+
+    async def fetch(self, location: int, using_date: date) -> Plan:
+        """returns the plan the site reports for that location and date"""
+
+        return Plan.from_dict(await self.fetch_raw(location, using_date), location=location)
+
+    @abstractmethod
+    async def fetch_raw(self, location: int, using_date: date) -> PlanDict:
+        """extracts the plan as nested dicts"""
+
+    async def close(self) -> None:
+        """releases connections etc. held by the backend"""
+
+
+class ScrapyFetcher(MenuFetcher):
+    """original backend: MensaSpider via scrapyscript. Runs in a worker thread,
+    so the event loop isn't blocked while the subprocess crawls"""
+
+    async def fetch_raw(self, location: int, using_date: date) -> PlanDict:
+        return await asyncio.to_thread(self._crawl, self.url(location, using_date))
+
+    @staticmethod
+    def _crawl(url: str) -> PlanDict:
+        # scrapy/twisted are only imported on the first crawl, not at startup
+        # pylint: disable=import-outside-toplevel
+        from scrapyscript import Job, Processor
+
+        from mensa_spider import MensaSpider
+
+        mensa_data = Processor(settings=None).run(Job(MensaSpider, start_urls=[url]))
+
+        # MensaSpider yields one item for every page it got, even one without a plan
+        if not mensa_data:
+            raise FetchError(f"crawl of '{url}' returned nothing")
+        return mensa_data[0]
+
+
+class HttpFetcher(MenuFetcher):
+    """fetches the page with a single (pooled) async HTTP request and parses it with lxml"""
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self.client = None
+
+    async def fetch_raw(self, location: int, using_date: date) -> PlanDict:
+        if self.client is None:
+            # pylint: disable-next=import-outside-toplevel
+            import httpx
+
+            self.client = httpx.AsyncClient(timeout=30, follow_redirects=True)
+
+        response = await self.client.get(self.url(location, using_date))
+        response.raise_for_status()
+
+        return parse_speiseplan(response.text)
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+class FixtureFetcher(MenuFetcher):
+    """reads '<location>_<YYYY-MM-DD>.html' from the directory set as 'fixture_dir'"""
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self.fixture_dir = config["fixture_dir"]
+
+    async def fetch_raw(self, location: int, using_date: date) -> PlanDict:
+        path = os.path.join(self.fixture_dir, f"{location}_{using_date}.html")
+
+        try:
+            with open(path, "r", encoding="utf8") as fobj:
+                return parse_speiseplan(fobj.read())
+        except FileNotFoundError:
+            return empty_plan()
+
+
+FETCH_BACKENDS = {
+    "scrapy": ScrapyFetcher,
+    "http": HttpFetcher,
+    "fixture": FixtureFetcher,
+}
+
+
+def create_fetcher(config: dict) -> MenuFetcher:
+    """instantiates the backend named by config['fetch_backend']"""
+
+    try:
+        backend = FETCH_BACKENDS[config["fetch_backend"]]
+    except KeyError as exc:
+        raise ValueError(
+            f"unknown fetch_backend '{config['fetch_backend']}', "
+            f"choose one of: {', '.join(FETCH_BACKENDS)}"
+        ) from exc
+
+    return backend(config)
@@ -0,0 +1,367 @@
+"""compact, immutable model of a speiseplan: Plan → MealGroup → Meal.
+
+derived values (shared price flag, numeric prices, content hash) are computed once when
+a plan is built, not on every render. Plans serialize to a compact JSON string for the
+plan cache in jobs.db. The *Dict types describe the raw form the fetch backends extract.
+"""
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Optional, TypedDict
+
+PRICE_PATTERN = re.compile(r"\d+(?:,\d+)?")
+WORD_PATTERN = re.compile(r"\w+")
+
+# tag → word stems that assign it, searched in meal group type, meal name and ingredients.
+# a stem has to start or end a word ('Schweineschnitzel', 'Hackfleisch'),
+# so that e.g. 'Flammkuchen' isn't 'lamm'. vegetarisch/vegan are only assigned if declared:
+# a meal that merely doesn't mention meat isn't necessarily vegetarian
+TAG_RULES = {
+    "vegan": ("vegan",),
+    "vegetarisch": ("vegetar", "vegan"),
+    "fleisch": (
+        "fleisch",
+        "schwein",
+        "rind",
+        "geflügel",
+        "hähnchen",
+        "pute",
+        "lamm",
+        "hack",
+        "wurst",
+        "speck",
+        "schinken",
+        "salami",
+        "gulasch",
+        "bolognese",
+        "carne",
+        "leber",
+        "cevapcici",
+    ),
+    "fisch": (
+        "fisch",
+        "lachs",
+        "forelle",
+        "hering",
+        "garnele",
+        "kabeljau",
+        "makrele",
+        "krabbe",
+    ),
+}
+# a meal group or meal declared vegetarisch/vegan never gets these
+MEAT_TAGS = frozenset(("fleisch", "fisch"))
+# words starting with these are meat substitutes ('Sojafleisch', 'Veggiewurst'),
+# their meat stems don't count
+SUBSTITUTE_PREFIXES = ("soja", "tofu", "seitan", "veggie", "vegan", "vegetar")
+# shortest word beginning/ending that is indexed as keyword,
+# so that 'schnitzel' also finds 'Schweineschnitzel' and 'curry' finds 'Currywurst'
+MIN_KEYWORD_PART = 4
+
+
+class MealDict(TypedDict):
+    """a single dish, e.g. 'Spaghetti Bolognese'"""
+
+    name: str
+    additional_ingredients: list[str]
+    prices: str
+
+
+class MealGroupDict(TypedDict):
+    """all dishes of one type, e.g. 'Vegetarisches Gericht'"""
+
+    type: str
+    sub_meals: list[MealDict]
+
+
+class PlanDict(TypedDict):
+    """the plan as reported by the site. 'date' is the date label the site selected
+    (e.g. 'Montag, 30.01.2023'), or None if the page didn't contain a plan at all"""
+
+    date: Optional[str]
+    meal_groups: list[MealGroupDict]
+
+
+@dataclass(frozen=True, slots=True)
+class Meal:
+    """a single dish. prices is the text shown on the site (students / staff / guests),
+    price_values the same prices as numbers"""
+
+    name: str
+    additional_ingredients: tuple[str, ...]
+    prices: str
+    price_values: tuple[float, ...]
+
+    @classmethod
+    def build(cls, name: str, additional_ingredients, prices: str) -> "Meal":
+        """creates a meal, parsing the price text"""
+
+        return cls(
+            name=name,
+            additional_ingredients=tuple(additional_ingredients),
+            prices=prices,
+            price_values=tuple(
+                float(price.replace(",", ".")) for price in PRICE_PATTERN.findall(prices)
+            ),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class MealGroup:
+    """all dishes of one type. price_is_shared: every dish costs the same,
+    so the price is only printed once"""
+
+    type: str
+    meals: tuple[Meal, ...]
+    price_is_shared: bool
+
+    @classmethod
+    def build(cls, meal_type: str, meals) -> "MealGroup":
+        """creates a meal group, checking if all meals share the same price"""
+
+        meals = tuple(meals)
+        return cls(
+            type=meal_type,
+            meals=meals,
+            price_is_shared=len({meal.prices for meal in meals}) <= 1,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Plan:
+    """plan of one location. date_label is the date the site selected (e.g. 'Montag, 30.01.2023'),
+    date the same as a date object. Both are None if the page contained no plan"""
+
+    location: int
+    date_label: Optional[str]
+    date: Optional[date]
+    meal_groups: tuple[MealGroup, ...]
+    content_hash: str
+    # tag / keyword → positions (meal group index, meal index) of the meals that have it
+    tag_index: dict = field(compare=False, repr=False)
+    keyword_index: dict = field(compare=False, repr=False)
+
+    @classmethod
+    def build(cls, location: int, date_label: Optional[str], meal_groups) -> "Plan":
+        """creates a plan, parsing the date label, hashing the content and indexing the meals"""
+
+        meal_groups = tuple(meal_groups)
+        tag_index, keyword_index = index_meals(meal_groups)
+        return cls(
+            location=location,
+            date_label=date_label,
+            date=parse_date_label(date_label),
+            meal_groups=meal_groups,
+            content_hash=hash_content(_to_json(date_label, meal_groups)),
+            tag_index=tag_index,
+            keyword_index=keyword_index,
+        )
+
+    @classmethod
+    def from_dict(cls, mensa_data: PlanDict, location: int) -> "Plan":
+        """converts the nested dicts returned by the fetch backends"""
+
+        return cls.build(
+            location=location,
+            date_label=mensa_data["date"],
+            meal_groups=(
+                MealGroup.build(
+                    meal_group["type"],
+                    (
+                        Meal.build(
+                            meal["name"], meal["additional_ingredients"], meal["prices"]
+                        )
+                        for meal in meal_group["sub_meals"]
+                    ),
+                )
+                for meal_group in mensa_data["meal_groups"]
+            ),
+        )
+
+    @classmethod
+    def from_json(cls, data: str, location: int) -> "Plan":
+        """inverse of to_json"""
+
+        date_label, meal_groups = json.loads(data)
+        return cls.build(
+            location=location,
+            date_label=date_label,
+            meal_groups=(
+                MealGroup.build(
+                    meal_type,
+                    (Meal.build(name, ingredients, prices) for name, ingredients, prices in meals),
+                )
+                for meal_type, meals in meal_groups
+            ),
+        )
+
+    def to_json(self) -> str:
+        """compact serialization (nested lists, no derived values) for the plan cache"""
+
+        return _to_json(self.date_label, self.meal_groups)
+
+    def diff(self, older: "Plan") -> "PlanDiff":
+        """per-meal changes from an older version of this plan.
+        meals are matched by meal group type and name"""
+
+        old_meals = older.meals_by_key()
+        new_meals = self.meals_by_key()
+
+        return PlanDiff(
+            added=tuple(key for key in new_meals if key not in old_meals),
+            removed=tuple(key for key in old_meals if key not in new_meals),
+            changed=tuple(
+                key for key, meal in new_meals.items() if key in old_meals and old_meals[key] != meal
+            ),
+            plan=self,
+        )
+
+    def meals_by_key(self) -> dict:
+        """{(meal group type, meal name): Meal} in plan order"""
+
+        return {
+            (meal_group.type, meal.name): meal
+            for meal_group in self.meal_groups
+            for meal in meal_group.meals
+        }
+
+    def positions_with_tags(self, tags) -> set:
+        """positions of all meals that have at least one of the tags"""
+
+        positions = set()
+        for tag in tags:
+            positions |= self.tag_index.get(tag, frozenset())
+        return positions
+
+    def filtered(self, tags) -> "Plan":
+        """the plan as a chat with a /filter for tags sees it: only meals with at least one of
+        the tags, meal groups without any are left out. no tags: the plan itself"""
+
+        if not tags:
+            return self
+
+        visible = self.positions_with_tags(tags)
+        meal_groups = []
+        for group_index, meal_group in enumerate(self.meal_groups):
+            meals = [
+                meal
+                for meal_index, meal in enumerate(meal_group.meals)
+                if (group_index, meal_index) in visible
+            ]
+            if meals:
+                meal_groups.append(MealGroup.build(meal_group.type, meals))
+
+        return Plan.build(
+            location=self.location, date_label=self.date_label, meal_groups=meal_groups
+        )
+
+    def is_available_for(self, using_date: date) -> bool:
+        """the site falls back to the current date if the requested date is too far in the future.
+        so a plan only exists for a date if the site reports that exact date"""
+
+        return self.date == using_date
+
+
+@dataclass(frozen=True, slots=True)
+class PlanDiff:
+    """result of Plan.diff. added/removed/changed hold (meal group type, meal name) keys,
+    plan is the newer plan (to look up added and changed meals)"""
+
+    added: tuple[tuple[str, str], ...]
+    removed: tuple[tuple[str, str], ...]
+    changed: tuple[tuple[str, str], ...]
+    plan: Plan
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def index_meals(meal_groups) -> tuple[dict, dict]:
+    """builds the inverted tag and keyword indexes of a plan (see TAG_RULES and MEAT_TAGS).
+    keywords are lowercase words of meal names and ingredients, plus their word beginnings
+    and endings (German compound words: 'schweineschnitzel' is also indexed as 'schwein'
+    and 'schnitzel'). Parts in the middle of a word aren't indexed"""
+
+    tag_index = {}
+    keyword_index = {}
+
+    for group_index, meal_group in enumerate(meal_groups):
+        for meal_index, meal in enumerate(meal_group.meals):
+            position = (group_index, meal_index)
+            declared = tags_of(f"{meal_group.type} {meal.name}")
+            tags = declared | tags_of(" ".join(meal.additional_ingredients))
+
+            if declared & {"vegetarisch", "vegan"}:
+                tags -= MEAT_TAGS
+
+            for tag in tags:
+                tag_index.setdefault(tag, set()).add(position)
+
+            for word in WORD_PATTERN.findall(" ".join((meal.name, *meal.additional_ingredients))):
+                word = word.lower()
+                keyword_index.setdefault(word, set()).add(position)
+                for split in range(MIN_KEYWORD_PART, len(word)):
+                    keyword_index.setdefault(word[:split], set()).add(position)
+                for start in range(1, len(word) - MIN_KEYWORD_PART + 1):
+                    keyword_index.setdefault(word[start:], set()).add(position)
+
+    return (
+        {tag: frozenset(positions) for tag, positions in tag_index.items()},
+        {keyword: frozenset(positions) for keyword, positions in keyword_index.items()},
+    )
+
+
+def tags_of(text: str) -> set:
+    """tags whose stems start or end one of the words of text.
+    meat substitutes (see SUBSTITUTE_PREFIXES) don't count as meat or fish"""
+
+    words = [word.lower() for word in WORD_PATTERN.findall(text)]
+    return {
+        tag
+        for tag, stems in TAG_RULES.items()
+        if any(
+            (word.startswith(stems) or word.endswith(stems))
+            and not (tag in MEAT_TAGS and word.startswith(SUBSTITUTE_PREFIXES))
+            for word in words
+        )
+    }
+
+
+def parse_date_label(date_label: Optional[str]) -> Optional[date]:
+    """'Montag, 30.01.2023' → date(2023, 1, 30). None if missing or malformed"""
+
+    if not date_label:
+        return None
+
+    try:
+        return datetime.strptime(date_label.split(",")[-1].strip(), "%d.%m.%Y").date()
+    except ValueError:
+        return None
+
+
+def hash_content(serialized: str) -> str:
+    """short, stable hash of a serialized plan"""
+
+    return hashlib.blake2b(serialized.encode("utf8"), digest_size=8).hexdigest()
+
+
+def _to_json(date_label: Optional[str], meal_groups) -> str:
+    return json.dumps(
+        [
+            date_label,
+            [
+                [
+                    meal_group.type,
+                    [
+                        [meal.name, list(meal.additional_ingredients), meal.prices]
+                        for meal in meal_group.meals
+                    ],
+                ]
+                for meal_group in meal_groups
+            ],
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
@@ -0,0 +1,43 @@
+"""consistent hashing of chat ids onto worker processes.
+
+every worker is placed on a hash ring many times (virtual nodes), a chat belongs to the
+first worker point at or after the chat's own hash. When a worker joins or leaves,
+only the chats between its points and their predecessors move, the rest keep their worker.
+"""
+import hashlib
+from bisect import bisect_left
+from typing import Optional
+
+# points per worker. more points → more even split, slower ring construction
+VIRTUAL_NODES = 160
+
+
+def ring_hash(key: str) -> int:
+    """stable 64 bit position on the ring (unlike hash(), the same in every process)"""
+
+    return int.from_bytes(hashlib.blake2b(key.encode("utf8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """immutable ring over a set of worker names"""
+
+    def __init__(self, workers, virtual_nodes: int = VIRTUAL_NODES):
+        self.workers = tuple(sorted(workers))
+
+        points = sorted(
+            (ring_hash(f"{worker}#{index}"), worker)
+            for worker in self.workers
+            for index in range(virtual_nodes)
+        )
+        self.positions = [position for position, _ in points]
+        self.owners = [worker for _, worker in points]
+
+    def worker_for(self, chat_id: int) -> Optional[str]:
+        """worker responsible for chat_id. None if the ring is empty"""
+
+        if not self.positions:
+            return None
+
+        index = bisect_left(self.positions, ring_hash(str(chat_id)))
+        # wrapping around: hashes after the last point belong to the first one
+        return self.owners[index % len(self.owners)]
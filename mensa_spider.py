@@ -0,0 +1,113 @@
+"""scrapy spider for the Studentenwerk Leipzig speiseplan.
+kept in its own module so that bot.py only imports scrapy when a crawl actually happens"""
+import scrapy
+
+
+class MensaSpider(scrapy.Spider):
+    """scrapy Spider instance that scrapes data from Studentenwerk Leipzig.
+    Has to be instantiated using URL with date parameter"""
+
+    name = "mensaplan"
+
+    def parse(self, response, **kwargs):
+
+        result = {
+            "date": "",
+            "meal_groups": []
+        }
+
+        # extracted date from website, to verify if it matches requested date
+        result["date"] = response.css(
+            'select#edit-date>option[selected="selected"]::text'
+        ).get()
+
+        for header in response.css("h3.title-prim"):
+            # can contain one or multiple individual meal items
+            meal_group = {
+                "type": "",
+                "sub_meals": []
+            }
+            # TYP
+            meal_group["type"] = header.xpath("text()").get()
+
+            # ALL following siblings
+            for subitem in header.xpath("following-sibling::*"):
+
+                if subitem.attrib == {"class": "title-prim"}: # or len(subitem.xpath("following-sibling::*")) == 0:
+                    break
+                # new sub meal was found
+
+                elif subitem.attrib == {"class": "accordion u-block"}:
+                    for subsubitem in subitem.xpath("child::section"):
+                        meal = {
+                            "name": subsubitem.xpath("header/div/div/h4/text()").get(),
+                            "additional_ingredients": subsubitem.xpath("details/ul/li/text()").getall(),
+                            "prices": subsubitem.xpath("header/div/div/p/text()[2]").get().strip()
+                        }
+                        
+                        # saving extracted data to individual meal data
+                        meal_group["sub_meals"].append(meal)
+
+            result["meal_groups"].append(meal_group)
+
+
+        yield result
+
+        # result = {
+        #     "date": "",
+        #     "all_meals": []
+        # }
+
+        # # extracted date from website, to verify if it matches requested date
+        # result["date"] = response.css(
+        #     'select#edit-date>option[selected="selected"]::text'
+        # ).get()
+
+        # for header in response.css("h3.title-prim"):
+        #     # contains all 'root-level' meal types
+        #     meal_group = {
+        #         "type": "",
+        #         "sub_meals": []
+        #     }
+
+        #     # gets appended to meal_group['sub_meal']
+        #     # a meal group can have 1 or more meals
+        #     meal = {
+        #         "name": "",
+        #         "additional_ingredients": [],
+        #         "prices": ""
+        #     }
+
+        #     # type of meal, like 'vegetarian'
+        #     # meal["type"] = header.xpath("text()").get()
+
+        #     for subitem in header.xpath("following-sibling::*"):
+        #         meal_group["type"] = header.xpath("text()").get()
+
+        #         # title-prim ≙ begin of next menu type/end of this menu → stop processing
+        #         if subitem.attrib == {"class": "title-prim"}:
+        #             #print("END OF", header.xpath("text()").get())
+        #             ######## end of block - write out meal type
+        #             # meal_group["type"] = header.xpath("text()").get()
+        #             #result['all_meals'].append(meal_group)
+        #             break
+
+        #         # accordion u-block: top-level item of a meal type
+        #         # (usually there just is 1 u-block but there can be multiple)
+        #         if subitem.attrib == {"class": "accordion u-block"}:
+        #             for subsubitem in subitem.xpath("child::section"):
+
+        #                 meal["name"] = subsubitem.xpath("header/div/div/h4/text()").get()
+        #                 meal["additional_ingredients"] = subsubitem.xpath(
+        #                     "details/ul/li/text()"
+        #                 ).getall()
+        #                 meal["prices"] = (
+        #                     subsubitem.xpath("header/div/div/p/text()[2]").get().strip()
+        #                 )
+        #                 # saving extracted data to individual meal data
+        #                 meal_group["sub_meals"].append(meal)
+                
+        #         print("AFTER BREAK???")
+        #         result['all_meals'].append(meal_group)
+                
+        # yield result
@@ -0,0 +1,10 @@
+"""small statistics helpers, shared by /stats in bot.py and the benchmark scripts"""
+
+
+def percentile(values: list, pct: float) -> float:
+    """nearest-rank percentile of an already sorted list. nan if it is empty"""
+
+    if not values:
+        return float("nan")
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
@@ -0,0 +1,147 @@
+"""startup regression benchmark for the bot.
+
+1. profiles 'import bot' with '-X importtime' and lists the most expensive imports.
+   fails if one of the heavy subsystems (scrapy/twisted/playwright) is imported at startup
+2. measures time-to-first-update: from spawning 'python bot.py' until the reply to
+   a queued /when command arrives at a local stand-in for the Telegram Bot API
+
+Usage: python startup_bench.py --runs 5 --max-ms 1500
+exits with 1 if a heavy module is imported eagerly or the median exceeds --max-ms.
+bot.py uses a PidFile, so don't run this on a machine where the bot is already running.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time as timer
+
+from loadtest import REPO_DIR, FakeTelegramAPI
+
+# only to be imported when a crawl or grade fetch actually happens
+HEAVY_MODULES = ("scrapy", "scrapyscript", "twisted", "playwright")
+
+
+def prepare_workdir(api_base_url: str) -> str:
+    """scratch dir with everything bot.py needs to start: token, config and empty jobs.db"""
+
+    workdir = tempfile.mkdtemp(prefix="mensa-startup-")
+
+    with open(os.path.join(workdir, "token.txt"), "w", encoding="utf8") as fobj:
+        fobj.write("startupbench\n")
+    with open(os.path.join(workdir, "config.txt"), "w", encoding="utf8") as fobj:
+        fobj.write(f"api_base_url = {api_base_url}\ngrades_poller = off\n")
+
+    con = sqlite3.connect(os.path.join(workdir, "jobs.db"))
+    con.execute("CREATE TABLE chatids(id type unique, hour, min)")
+    con.commit()
+    con.close()
+
+    return workdir
+
+
+def profile_imports(workdir: str) -> tuple[float, list, list]:
+    """runs 'import bot' with -X importtime.
+    returns total ms, the 10 most expensive direct imports of bot and eagerly imported heavy modules"""
+
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bot"],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total_ms = 0.0
+    direct = []
+    heavy = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if name.strip().split(".")[0] in HEAVY_MODULES:
+            heavy.add(name.strip().split(".")[0])
+
+        # nested imports are indented by two spaces per level below their parent
+        depth = (len(name) - len(name.lstrip())) // 2
+        if name.strip() == "bot":
+            total_ms = int(cumulative) / 1000
+        elif depth == 1:
+            direct.append((int(cumulative) / 1000, name.strip()))
+
+    direct.sort(reverse=True)
+    return total_ms, direct[:10], sorted(heavy)
+
+
+def time_to_first_update(workdir: str, telegram_api: FakeTelegramAPI, timeout: float) -> float:
+    """seconds from process spawn until the answer to /when is received"""
+
+    sent_before = len(telegram_api.sent)
+    telegram_api.queue_command(chat_id=42, text="/when")
+
+    started = timer.perf_counter()
+    proc = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, os.path.join(REPO_DIR, "bot.py")],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        while len(telegram_api.sent) == sent_before:
+            if timer.perf_counter() - started > timeout or proc.poll() is not None:
+                raise RuntimeError("bot didn't answer (already running? see PidFile)")
+            timer.sleep(0.005)
+        return timer.perf_counter() - started
+
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("--runs", type=int, default=5, help="bot starts to measure")
+    parser.add_argument("--max-ms", type=float, help="fail if median time-to-first-update exceeds")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds per start")
+    args = parser.parse_args()
+
+    telegram_api = FakeTelegramAPI().start()
+    workdir = prepare_workdir(telegram_api.base_url)
+
+    total_ms, top_imports, heavy = profile_imports(workdir)
+    print(f"import bot: {total_ms:.1f} ms")
+    for ms, name in top_imports:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    samples = [
+        time_to_first_update(workdir, telegram_api, args.timeout) * 1000 for _ in range(args.runs)
+    ]
+    median = statistics.median(samples)
+    print(
+        f"time-to-first-update: median {median:.0f} ms, "
+        f"min {min(samples):.0f} ms, max {max(samples):.0f} ms ({args.runs} runs)"
+    )
+
+    telegram_api.stop()
+    shutil.rmtree(workdir)
+
+    failed = False
+    if heavy:
+        print(f"REGRESSION: imported at startup: {', '.join(heavy)}")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"REGRESSION: median {median:.0f} ms > {args.max_ms:.0f} ms")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
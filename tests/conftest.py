@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# bot.py opens jobs.db in the working directory on import, keep it away from the real one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp(prefix="mensabot-tests-"))
@@ -0,0 +1,48 @@
+import pytest
+
+from bot import FilterManager
+from tests.test_mensa_plan import build_plan
+
+PLAN = build_plan(
+    ("Tagesgericht", [("Currywurst mit Pommes", ()), ("Chili con Carne", ("Rind",))]),
+    ("Vegetarisches Gericht", [("Kartoffelpuffer mit Apfelmus", ())]),
+)
+
+
+@pytest.fixture
+def filters():
+    manager = FilterManager()
+    for chat_id in list(FilterManager.alerts):
+        manager.clear_alerts(chat_id)
+    return manager
+
+
+@pytest.mark.parametrize(
+    "keyword, matches",
+    [
+        ("currywurst", True),
+        ("curry", True),
+        ("wurst", True),
+        ("kartoffel", True),
+        ("puffer", True),
+        ("chili", True),
+        # ingredients are searched, too
+        ("rind", True),
+        ("schnitzel", False),
+        # too short parts of words are not indexed
+        ("kar", False),
+        ("gemüsecurry", False),
+    ],
+)
+def test_match_alerts(filters, keyword, matches):
+    filters.add_alert(1, keyword)
+    assert filters.match_alerts(PLAN) == ({1: {keyword}} if matches else {})
+
+
+def test_match_alerts_several_chats(filters):
+    filters.add_alert(1, "curry")
+    filters.add_alert(1, "kartoffel")
+    filters.add_alert(2, "curry")
+    filters.add_alert(3, "lasagne")
+
+    assert filters.match_alerts(PLAN) == {1: {"curry", "kartoffel"}, 2: {"curry"}}
@@ -0,0 +1,105 @@
+import pytest
+
+from mensa_plan import Meal, MealGroup, Plan, tags_of
+
+LABEL = "Montag, 19.10.2026"
+
+
+def build_plan(*meal_groups) -> Plan:
+    """plan of (meal type, [(name, ingredients)]) groups"""
+
+    return Plan.build(
+        location=1,
+        date_label=LABEL,
+        meal_groups=[
+            MealGroup.build(
+                meal_type,
+                [Meal.build(name, ingredients, "3,50 €") for name, ingredients in meals],
+            )
+            for meal_type, meals in meal_groups
+        ],
+    )
+
+
+def tags_of_meal(meal_type: str, name: str, ingredients=()) -> set:
+    plan = build_plan((meal_type, [(name, ingredients)]))
+    return {tag for tag, positions in plan.tag_index.items() if (0, 0) in positions}
+
+
+@pytest.mark.parametrize(
+    "text, tags",
+    [
+        ("Chili con Carne", {"fleisch"}),
+        ("Leberkäse mit Spiegelei", {"fleisch"}),
+        ("Cevapcici mit Ajvar", {"fleisch"}),
+        ("Krabbensalat", {"fisch"}),
+        ("Currywurst mit Pommes", {"fleisch"}),
+        # the name declares it vegan, index_meals drops the meat tag (see below)
+        ("Vegane Bolognese", {"vegan", "vegetarisch", "fleisch"}),
+        # substitutes are not meat
+        ("Tofu mit Sojafleisch", set()),
+        ("Veggiewurst mit Kartoffelsalat", set()),
+        # stems inside a word don't count
+        ("Kartoffelpuffer mit Apfelmus", set()),
+        ("Gemüsecurry mit Reis", set()),
+        ("Penne Arrabiata", set()),
+    ],
+)
+def test_tags_of(text, tags):
+    assert tags_of(text) == tags
+
+
+@pytest.mark.parametrize(
+    "meal_type, name, ingredients, tags",
+    [
+        # only the declared type makes a meal vegetarian, an untagged dish is not
+        ("Vegetarisches Gericht", "Flammkuchen", (), {"vegetarisch"}),
+        ("Tagesgericht", "Flammkuchen", (), set()),
+        ("Tagesgericht", "Penne Arrabiata", (), set()),
+        ("Tagesgericht", "Chili con Carne", ("Rind",), {"fleisch"}),
+        ("Tagesgericht", "Krabbensalat", (), {"fisch"}),
+        ("Vegan", "Gemüsecurry mit Reis", (), {"vegan", "vegetarisch"}),
+        ("Tagesgericht", "Vegane Bolognese", (), {"vegan", "vegetarisch"}),
+        # a declared vegetarian dish never counts as meat, even with a meaty name
+        ("Vegetarisches Gericht", "Tofu mit Sojafleisch", ("Hackfleischersatz",), {"vegetarisch"}),
+        # ingredients add tags
+        ("Tagesgericht", "Eintopf", ("Speck",), {"fleisch"}),
+    ],
+)
+def test_index_meals_tags(meal_type, name, ingredients, tags):
+    assert tags_of_meal(meal_type, name, ingredients) == tags
+
+
+@pytest.mark.parametrize(
+    "name, keywords, not_keywords",
+    [
+        ("Currywurst mit Pommes", {"currywurst", "curry", "wurst", "pommes"}, {"cur", "rryw"}),
+        ("Kartoffelpuffer mit Apfelmus", {"kartoffel", "puffer", "apfelmus", "apfel"}, {"kar"}),
+        ("Gemüsecurry", {"gemüsecurry", "gemüse", "curry"}, {"gem"}),
+        ("Leberkäse", {"leberkäse", "leber", "käse"}, set()),
+    ],
+)
+def test_index_meals_keywords(name, keywords, not_keywords):
+    plan = build_plan(("Tagesgericht", [(name, ())]))
+    assert keywords <= set(plan.keyword_index)
+    assert not not_keywords & set(plan.keyword_index)
+
+
+def test_filtered():
+    plan = build_plan(
+        ("Vegetarisches Gericht", [("Flammkuchen", ())]),
+        ("Tagesgericht", [("Currywurst mit Pommes", ()), ("Penne Arrabiata", ())]),
+    )
+
+    meat = plan.filtered(frozenset({"fleisch"}))
+    assert [(group.type, [meal.name for meal in group.meals]) for group in meat.meal_groups] == [
+        ("Tagesgericht", ["Currywurst mit Pommes"])
+    ]
+    assert meat.date_label == LABEL
+    assert plan.filtered(frozenset()) is plan
+    # the unfiltered view doesn't change when a meal outside the filter changes
+    changed = build_plan(
+        ("Vegetarisches Gericht", [("Flammkuchen", ())]),
+        ("Tagesgericht", [("Currywurst mit Pommes", ()), ("Spaghetti", ())]),
+    )
+    assert changed.filtered(frozenset({"fleisch"})).content_hash == meat.content_hash